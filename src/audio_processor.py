@@ -7,22 +7,159 @@
 """
 
 import os
+import re
 import time
 import wave
 import logging
 import tempfile
 import hashlib
+import math
+import struct
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from fractions import Fraction
 import numpy as np
 import scipy.io.wavfile
 import scipy.signal
-from typing import Dict, Any, Optional, Tuple
+import scipy.fft
+from typing import Dict, Any, Optional, Tuple, List
+
+# xxhash为可选依赖，不可用时使用hashlib.blake2b计算缓存键
+have_xxhash = False
+try:
+    import xxhash
+    have_xxhash = True
+except ImportError:
+    pass
+
+# numba为可选依赖，仅用于快速Hermite重采样
+have_numba = False
+try:
+    import numba
+    have_numba = True
+except ImportError:
+    pass
+
+# pyfftw为可选依赖，用作FFT重采样的后端
+have_fftw = False
+try:
+    import pyfftw
+    import pyfftw.interfaces.scipy_fft
+    have_fftw = True
+except ImportError:
+    pass
 
 # 配置日志
 logger = logging.getLogger('AudioProcessor')
 
+# 44字节PCM WAV文件头模板
+_WAV_HEADER = struct.Struct('<4sI4s4sIHHIIHH4sI')
+
+def _write_pcm_wav(path: str, pcm, channels: int, sample_width: int, rate: int) -> None:
+    """写出PCM WAV文件
+    
+    直接打包固定的44字节文件头，一次写文件头、一次写数据。
+    
+    Args:
+        path: 输出文件路径
+        pcm: PCM数据，任何支持缓冲区协议的连续对象
+        channels: 通道数
+        sample_width: 采样字节数
+        rate: 采样率
+    """
+    size = memoryview(pcm).nbytes
+    with open(path, 'wb') as f:
+        f.write(_WAV_HEADER.pack(b'RIFF', 36 + size, b'WAVE', b'fmt ', 16, 1,
+                                 channels, rate, rate * channels * sample_width,
+                                 channels * sample_width, sample_width * 8,
+                                 b'data', size))
+        f.write(pcm)
+
+def _read_wav_rate(path: str) -> int:
+    """读取WAV文件的采样率
+    
+    fmt块紧跟RIFF头的常见文件只读取并解析前44字节，其他情况交给wave模块。
+    
+    Args:
+        path: WAV文件路径
+        
+    Returns:
+        采样率
+    """
+    # 直接用文件描述符读取，不创建带8KB缓冲区的文件对象
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        head = os.read(fd, _WAV_HEADER.size)
+    finally:
+        os.close(fd)
+    if len(head) == _WAV_HEADER.size:
+        fields = _WAV_HEADER.unpack(head)
+        if fields[0] == b'RIFF' and fields[2] == b'WAVE' and fields[3] == b'fmt ':
+            return fields[7]
+    with wave.open(path, 'rb') as wf:
+        return wf.getframerate()
+
+def _unlink_quietly(path: str) -> None:
+    """删除文件，忽略文件不存在等错误
+    
+    Args:
+        path: 文件路径
+    """
+    try:
+        os.unlink(path)
+    except OSError:
+        pass
+
+def _new_hasher():
+    """创建用于计算缓存键的哈希对象
+    
+    Returns:
+        支持update()/hexdigest()的哈希对象
+    """
+    if have_xxhash:
+        return xxhash.xxh3_64()
+    return hashlib.blake2b(digest_size=8)
+
+def _hermite_resample(x, ratio):
+    """4点三次Hermite插值重采样
+    
+    不带抗混叠滤波，质量低于多相滤波，但无FFT且无额外内存分配。
+    
+    Args:
+        x: float32采样数据
+        ratio: 目标采样率与原始采样率之比
+        
+    Returns:
+        重采样后的float32数据
+    """
+    n = len(x)
+    n_out = int(n * ratio)
+    y = np.empty(n_out, dtype=np.float32)
+    step = 1.0 / ratio
+    for i in range(n_out):
+        pos = i * step
+        j = int(pos)
+        t = pos - j
+        xm1 = x[j - 1] if j >= 1 else x[0]
+        x0 = x[j]
+        x1 = x[j + 1] if j + 1 < n else x[n - 1]
+        x2 = x[j + 2] if j + 2 < n else x[n - 1]
+        c1 = 0.5 * (x1 - xm1)
+        c2 = xm1 - 2.5 * x0 + 2.0 * x1 - 0.5 * x2
+        c3 = 0.5 * (x2 - xm1) + 1.5 * (x0 - x1)
+        y[i] = ((c3 * t + c2) * t + c1) * t + x0
+    return y
+
+if have_numba:
+    _hermite_resample = numba.njit(cache=True, fastmath=True)(_hermite_resample)
+
 class AudioProcessor:
     """音频处理类"""
     
+    # 多相重采样FIR滤波器，进程内所有实例共享: (原始采样率, 目标采样率) -> 滤波器系数
+    _KERNEL_CACHE: Dict[Tuple[int, int], np.ndarray] = {}
+    
     def __init__(self, config: Dict[str, Any] = None):
         """初始化音频处理器
         
@@ -33,15 +170,34 @@ def __init__(self, config: Dict[str, Any] = None):
         self.config = {
             "target_sample_rate": 12000,  # 目标采样率，FT8解码通常需要12kHz
             "temp_dir": tempfile.gettempdir(),  # 临时文件目录
-            "cache_size": 10,  # 缓存大小
+            "cache_size": 10,  # 缓存大小(条目数)
+            "cache_max_bytes": 64 * 1024 * 1024,  # 缓存数组占用的最大字节数
+            "use_fast_resample": False,  # 使用numba加速的Hermite插值代替多相滤波重采样
+            "use_fft_resample": False,  # 使用多线程FFT重采样代替多相滤波重采样
         }
         
         # 更新配置
         if config:
             self.config.update(config)
             
-        # 初始化缓存
-        self.resampling_cache = {}
+        # 临时目录只在初始化时创建，每个周期重采样时不再调用makedirs
+        os.makedirs(self.config["temp_dir"], exist_ok=True)
+            
+        if self.config["use_fast_resample"] and not have_numba:
+            logger.warning("未安装numba，快速重采样不可用，使用多相滤波重采样")
+            
+        if self.config["use_fft_resample"]:
+            if have_fftw:
+                pyfftw.config.NUM_THREADS = os.cpu_count() or 1
+            logger.info(f"FFT重采样后端: {'pyfftw' if have_fftw else 'scipy.fft'}")
+            
+        # 初始化缓存: 缓存键 -> (int16采样数组, 采样率)
+        self.resampling_cache = OrderedDict()
+        self.cache_bytes = 0
+        # 已写出的WAV文件: 缓存键 -> 文件路径
+        self.cache_files = {}
+        # 批量重采样时多个线程共享缓存
+        self.cache_lock = threading.Lock()
             
         logger.info("音频处理器初始化完成")
         
@@ -49,99 +205,92 @@ def resample_audio_data(self, audio_data: Dict[str, Any]) -> Optional[str]:
         """重采样音频数据
         
         Args:
-            audio_data: 音频数据
+            audio_data: 音频数据，PCM为int16数组samples或字节帧列表frames，
+                可选的content_id字段作为内容标识代替哈希计算，
+                可选的samples_f32字段为与samples数值相同的float32单声道数组
             
         Returns:
             重采样后的WAV文件路径
         """
-        if not audio_data or not audio_data.get("frames"):
+        if not audio_data or not (len(audio_data.get("samples", ())) or audio_data.get("frames")):
             logger.error("无效的音频数据")
             return None
             
         try:
-            # 确保临时目录存在
-            os.makedirs(self.config["temp_dir"], exist_ok=True)
+            samples = audio_data.get("samples")
+            frames = [samples] if samples is not None else audio_data["frames"]
             
-            # 计算音频内容的哈希值
-            audio_bytes = b''.join(audio_data["frames"])
-            audio_hash = hashlib.md5(audio_bytes[:1024*10]).hexdigest()[:8]  # 使用前10KB计算哈希
+            if audio_data.get("content_id") is not None:
+                # 调用方已提供稳定的内容标识，无需计算哈希
+                audio_hash = re.sub(r'[^\w.-]', '_', str(audio_data["content_id"]))
+            else:
+                # 计算音频内容的哈希值，逐帧累计前10KB，无需先拼接全部帧
+                hasher = _new_hasher()
+                remaining = 1024*10
+                for frame in frames:
+                    view = memoryview(frame).cast('B')
+                    hasher.update(view[:remaining])
+                    remaining -= len(view)
+                    if remaining <= 0:
+                        break
+                audio_hash = hasher.hexdigest()[:8]
             
             # 构造缓存键
             cache_key = f"{audio_hash}_{audio_data['sample_rate']}_{self.config['target_sample_rate']}"
             
-            # 检查缓存
-            if cache_key in self.resampling_cache:
-                cache_path = self.resampling_cache[cache_key]
-                if os.path.exists(cache_path):
-                    logger.debug(f"使用缓存的重采样数据: {cache_path}")
-                    return cache_path
-                else:
-                    # 缓存文件不存在，删除缓存项
-                    del self.resampling_cache[cache_key]
-                    
             # 准备临时文件名
-            timestamp = audio_data.get("timestamp", time.strftime("%Y%m%d_%H%M%S"))
+            timestamp = audio_data.get("timestamp") or time.strftime("%Y%m%d_%H%M%S")
             temp_base = f"temp_{timestamp}_{audio_hash}"
             
             # 临时文件路径
             temp_wav = os.path.join(self.config["temp_dir"], f"{temp_base}.wav")
             temp_resampled_wav = os.path.join(self.config["temp_dir"], f"{temp_base}_resampled.wav")
+            needs_resample = audio_data["sample_rate"] != self.config["target_sample_rate"]
+            
+            # 检查缓存
+            cached = self.get_cached_array(cache_key)
+            if cached is not None:
+                logger.debug(f"使用缓存的重采样数据: {cache_key}")
+                return self._materialize(cache_key, temp_resampled_wav if needs_resample else temp_wav, *cached)
+                
+            # 缓存未命中时才拼接全部帧，录音器提供的samples已是连续数组
+            audio_bytes = samples if samples is not None else b''.join(frames)
+            
+            # 直接从内存中的PCM字节构造采样数组，无需经过临时WAV文件
+            data = np.frombuffer(audio_bytes, dtype=np.int16)
+            if audio_data["channels"] > 1:
+                data = data.reshape(-1, audio_data["channels"])
             
             # 检查是否需要重采样
-            if audio_data["sample_rate"] == self.config["target_sample_rate"]:
+            if not needs_resample:
                 # 不需要重采样，直接保存原始音频
-                with wave.open(temp_wav, 'wb') as wf:
-                    wf.setnchannels(audio_data["channels"])
-                    wf.setsampwidth(audio_data["sample_width"])
-                    wf.setframerate(audio_data["sample_rate"])
-                    wf.writeframes(audio_bytes)
+                self._add_to_cache(cache_key, data, audio_data["sample_rate"])
                 logger.debug(f"不需要重采样，保存原始音频: {temp_wav}")
-                
-                # 添加到缓存
-                self._add_to_cache(cache_key, temp_wav)
-                return temp_wav
+                return self._materialize(cache_key, temp_wav, data, audio_data["sample_rate"])
                 
             # 需要重采样
             logger.info(f"重采样从 {audio_data['sample_rate']}Hz 到 {self.config['target_sample_rate']}Hz")
             
-            # 保存原始WAV文件
-            with wave.open(temp_wav, 'wb') as wf:
-                wf.setnchannels(audio_data["channels"])
-                wf.setsampwidth(audio_data["sample_width"])
-                wf.setframerate(audio_data["sample_rate"])
-                wf.writeframes(audio_bytes)
-                
-            # 读取原始WAV文件
             try:
-                rate, data = scipy.io.wavfile.read(temp_wav)
-                
-                # 计算重采样比例
-                resample_ratio = self.config["target_sample_rate"] / rate
-                
-                # 计算新长度
-                new_length = int(len(data) * resample_ratio)
-                
-                # 使用scipy的重采样函数
-                resampled_data = scipy.signal.resample(data, new_length)
-                
-                # 保存重采样后的WAV文件
-                scipy.io.wavfile.write(temp_resampled_wav, self.config["target_sample_rate"], 
-                                       resampled_data.astype(np.int16))
-                                       
-                # 删除原始临时文件
-                try:
-                    os.remove(temp_wav)
-                except:
-                    pass
+                # 录音器降采样时已有float32数组，直接作为重采样输入，省去一次类型转换
+                samples_f32 = audio_data.get("samples_f32")
+                if samples_f32 is not None and audio_data["channels"] == 1:
+                    data = samples_f32
+                    
+                # 多相滤波重采样
+                resampled_data = self._resample(data, audio_data["sample_rate"], self.config["target_sample_rate"])
                     
                 # 添加到缓存
-                self._add_to_cache(cache_key, temp_resampled_wav)
+                resampled_data = self._to_int16(resampled_data)
+                self._add_to_cache(cache_key, resampled_data, self.config["target_sample_rate"])
                 
                 logger.debug(f"重采样完成: {temp_resampled_wav}")
-                return temp_resampled_wav
+                return self._materialize(cache_key, temp_resampled_wav, resampled_data,
+                                         self.config["target_sample_rate"])
             except Exception as e:
                 logger.error(f"重采样过程中出错: {e}")
-                # 返回原始WAV文件作为备用
+                # 保存原始WAV文件作为备用
+                self._write_wav(temp_wav, audio_data, audio_bytes)
                 logger.warning(f"使用原始文件作为备用: {temp_wav}")
                 return temp_wav
             
@@ -149,30 +298,278 @@ def resample_audio_data(self, audio_data: Dict[str, Any]) -> Optional[str]:
             logger.error(f"重采样音频数据出错: {e}")
             return None
             
-    def _add_to_cache(self, key: str, value: str) -> None:
+    def resample_batch(self, items: List[Dict[str, Any]], max_workers: int = None) -> List[Optional[str]]:
+        """并行重采样多段音频数据
+        
+        resample_poly的滤波循环会释放GIL，因此使用线程池即可利用多核。
+        
+        Args:
+            items: 音频数据列表
+            max_workers: 最大工作线程数，None则由线程池决定
+            
+        Returns:
+            与输入顺序对应的重采样后WAV文件路径列表
+        """
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            return list(executor.map(self.resample_audio_data, items))
+            
+    def get_cached_array(self, key: str) -> Optional[Tuple[np.ndarray, int]]:
+        """获取缓存的重采样数据
+        
+        Args:
+            key: 缓存键
+            
+        Returns:
+            (int16采样数组, 采样率)，未命中则返回None
+        """
+        with self.cache_lock:
+            entry = self.resampling_cache.get(key)
+            if entry is not None:
+                # 命中时移到末尾，使淘汰顺序为最近最少使用
+                self.resampling_cache.move_to_end(key)
+            return entry
+        
+    def _materialize(self, key: str, path: str, data: np.ndarray, rate: int) -> str:
+        """将缓存的采样数组写出为WAV文件
+        
+        同一缓存项只写出一次，之后直接返回已写出的文件路径。文件由本对象创建，
+        只在淘汰或清理缓存时删除，因此命中时不再检查文件是否存在；若文件被外部
+        删除，调用方可通过invalidate_file()使其在下次请求时重新写出。
+        
+        Args:
+            key: 缓存键
+            path: 尚未写出时使用的文件路径
+            data: int16采样数组
+            rate: 采样率
+            
+        Returns:
+            WAV文件路径
+        """
+        cache_path = self.cache_files.get(key)
+        if cache_path:
+            return cache_path
+            
+        _write_pcm_wav(path, np.ascontiguousarray(data),
+                       data.shape[1] if data.ndim > 1 else 1, 2, rate)
+        with self.cache_lock:
+            # 写出期间缓存项可能已被其他线程淘汰
+            if key in self.resampling_cache:
+                self.cache_files[key] = path
+        return path
+        
+    def invalidate_file(self, path: str) -> bool:
+        """使已写出的WAV文件失效
+        
+        缓存的采样数组保留，下次命中时重新写出文件。
+        
+        Args:
+            path: 之前返回的WAV文件路径
+            
+        Returns:
+            是否找到对应的缓存项
+        """
+        with self.cache_lock:
+            for key, cache_path in self.cache_files.items():
+                if cache_path == path:
+                    del self.cache_files[key]
+                    return True
+        return False
+        
+    def _write_wav(self, path: str, audio_data: Dict[str, Any], audio_bytes) -> None:
+        """按音频数据的参数保存原始PCM为WAV文件
+        
+        Args:
+            path: 输出文件路径
+            audio_data: 音频数据
+            audio_bytes: PCM数据，字节串或int16数组
+        """
+        _write_pcm_wav(path, audio_bytes, audio_data["channels"],
+                       audio_data["sample_width"], audio_data["sample_rate"])
+            
+    def _resample(self, data: np.ndarray, rate: int, target_rate: int) -> np.ndarray:
+        """重采样
+        
+        默认使用多相FIR滤波：FT8常见的源采样率(48000/44100/16000)与12000Hz之间是
+        简单的有理数比例，使用resample_poly可避免FFT重采样对数据长度分解的敏感性。
+        启用use_fast_resample且安装了numba时使用Hermite插值；启用use_fft_resample时
+        使用多线程FFT重采样。
+        
+        Args:
+            data: 音频采样数据
+            rate: 原始采样率
+            target_rate: 目标采样率
+            
+        Returns:
+            重采样后的float32数据
+        """
+        # 先显式转换为float32，避免scipy隐式提升为float64使内存带宽翻倍；已是float32时不复制
+        x = data.astype(np.float32, copy=False)
+        
+        if self.config["use_fast_resample"] and have_numba:
+            ratio = target_rate / rate
+            if x.ndim == 1:
+                return _hermite_resample(x, ratio)
+            return np.stack([_hermite_resample(np.ascontiguousarray(x[:, c]), ratio)
+                             for c in range(x.shape[1])], axis=1)
+            
+        if self.config["use_fft_resample"]:
+            return self._fft_resample(x, rate, target_rate)
+            
+        up, down, h = self.resample_filter(rate, target_rate)
+        return scipy.signal.resample_poly(x, up, down, window=h)
+        
+    def _fft_resample(self, x: np.ndarray, rate: int, target_rate: int) -> np.ndarray:
+        """FFT重采样，使用所有CPU核心计算FFT/IFFT
+        
+        Args:
+            x: float32采样数据
+            rate: 原始采样率
+            target_rate: 目标采样率
+            
+        Returns:
+            重采样后的数据
+        """
+        num = int(round(len(x) * target_rate / rate))
+        if have_fftw:
+            with scipy.fft.set_backend(pyfftw.interfaces.scipy_fft):
+                return scipy.signal.resample(x, num)
+        with scipy.fft.set_workers(-1):
+            return scipy.signal.resample(x, num)
+        
+    @classmethod
+    def resample_filter(cls, rate: int, target_rate: int) -> Tuple[int, int, np.ndarray]:
+        """获取多相重采样的上/下采样因子和FIR滤波器
+        
+        滤波器按采样率对缓存在类上，同一进程内的所有实例和录音器共用。
+        
+        Args:
+            rate: 原始采样率
+            target_rate: 目标采样率
+            
+        Returns:
+            (上采样因子, 下采样因子, float32滤波器系数)，可直接传给resample_poly
+        """
+        up, down = cls._rate_ratio(rate, target_rate)
+        return up, down, cls._get_filter(rate, target_rate, up, down)
+        
+    def prewarm(self, rates: Tuple[int, ...] = (44100, 48000, 8000)) -> None:
+        """预先设计常见源采样率到目标采样率的滤波器
+        
+        避免第一个解码周期承担滤波器设计的延迟。
+        
+        Args:
+            rates: 源采样率
+        """
+        target_rate = self.config["target_sample_rate"]
+        for rate in rates:
+            if rate != target_rate:
+                self.resample_filter(rate, target_rate)
+                
+    @staticmethod
+    def _rate_ratio(rate: int, target_rate: int) -> Tuple[int, int]:
+        """计算多相重采样的上/下采样因子
+        
+        用最大公约数精确约分，如48000->12000为1/4，44100->12000为40/147。
+        约分后因子仍过大的非常规采样率用有理数近似，避免滤波器过长。
+        
+        Args:
+            rate: 原始采样率
+            target_rate: 目标采样率
+            
+        Returns:
+            (上采样因子, 下采样因子)
+        """
+        g = math.gcd(target_rate, rate)
+        up, down = target_rate // g, rate // g
+        if max(up, down) > 1000:
+            ratio = Fraction(target_rate, rate).limit_denominator(1000)
+            logger.debug(f"采样率比例 {up}/{down} 过大，近似为 {ratio.numerator}/{ratio.denominator}")
+            up, down = ratio.numerator, ratio.denominator
+        return up, down
+        
+    @classmethod
+    def _get_filter(cls, rate: int, target_rate: int, up: int, down: int) -> np.ndarray:
+        """获取多相重采样的低通FIR滤波器
+        
+        与resample_poly内部的设计方法相同，但每对采样率只设计一次。
+        
+        Args:
+            rate: 原始采样率
+            target_rate: 目标采样率
+            up: 上采样因子
+            down: 下采样因子
+            
+        Returns:
+            float32滤波器系数
+        """
+        key = (rate, target_rate)
+        h = cls._KERNEL_CACHE.get(key)
+        if h is None:
+            max_rate = max(up, down)
+            h = scipy.signal.firwin(2 * 10 * max_rate + 1, 1.0 / max_rate,
+                                    window=('kaiser', 5.0)).astype(np.float32)
+            cls._KERNEL_CACHE[key] = h
+        return h
+        
+    def _to_int16(self, data: np.ndarray) -> np.ndarray:
+        """将重采样结果四舍五入、限幅并转换为int16
+        
+        直接astype会截断小数且超出范围的值会回绕，产生爆音。
+        
+        Args:
+            data: float32采样数据，会被原地修改
+            
+        Returns:
+            int16采样数组
+        """
+        out = np.empty(data.shape, dtype=np.int16)
+        np.rint(data, out=data)
+        np.clip(data, -32768, 32767, out=data)
+        np.copyto(out, data, casting='unsafe')
+        return out
+        
+    def _add_to_cache(self, key: str, data: np.ndarray, rate: int) -> None:
         """添加到缓存
         
         Args:
             key: 缓存键
-            value: 缓存值
+            data: int16采样数组
+            rate: 采样率
         """
-        # 限制缓存大小
-        if len(self.resampling_cache) >= self.config["cache_size"]:
-            # 删除最旧的缓存项
-            old_key = next(iter(self.resampling_cache))
-            old_file = self.resampling_cache.pop(old_key)
-            try:
-                if os.path.exists(old_file):
-                    os.remove(old_file)
-            except:
-                pass
+        with self.cache_lock:
+            if key in self.resampling_cache:
+                # 其他线程已缓存了相同内容
+                self.resampling_cache.move_to_end(key)
+                return
                 
-        # 添加新缓存项
-        self.resampling_cache[key] = value
+            # 限制缓存条目数和占用字节数
+            while self.resampling_cache and (
+                    len(self.resampling_cache) >= self.config["cache_size"] or
+                    self.cache_bytes + data.nbytes > self.config["cache_max_bytes"]):
+                # 删除最近最少使用的缓存项
+                self._evict(next(iter(self.resampling_cache)))
+                    
+            # 添加新缓存项
+            self.resampling_cache[key] = (data, rate)
+            self.cache_bytes += data.nbytes
+        
+    def _evict(self, key: str) -> None:
+        """删除缓存项及其写出的WAV文件
+        
+        Args:
+            key: 缓存键
+        """
+        data, _ = self.resampling_cache.pop(key)
+        self.cache_bytes -= data.nbytes
+        old_file = self.cache_files.pop(key, None)
+        if old_file:
+            _unlink_quietly(old_file)
         
     def resample_file(self, input_file: str, output_file: str = None, target_rate: int = None) -> Optional[str]:
         """重采样WAV文件
         
+        采样率已是目标采样率时直接返回输入文件，调用方无需预先检查。
+        
         Args:
             input_file: 输入WAV文件路径
             output_file: 输出WAV文件路径，如果为None则自动生成
@@ -186,63 +583,50 @@ def resample_file(self, input_file: str, output_file: str = None, target_rate: i
             return None
             
         try:
-            # 计算文件哈希值
-            with open(input_file, 'rb') as f:
-                file_hash = hashlib.md5(f.read(1024*1024)).hexdigest()[:8]  # 使用前1MB计算哈希
-                
-            # 读取原始WAV文件信息
-            with wave.open(input_file, 'rb') as wf:
-                channels = wf.getnchannels()
-                sampwidth = wf.getsampwidth()
-                framerate = wf.getframerate()
+            # 读取原始WAV文件的采样率，只解析文件头
+            framerate = _read_wav_rate(input_file)
                 
             # 目标采样率
             if target_rate is None:
                 target_rate = self.config["target_sample_rate"]
                 
-            # 构造缓存键
-            cache_key = f"{file_hash}_{framerate}_{target_rate}"
-            
-            # 检查缓存
-            if cache_key in self.resampling_cache:
-                cache_path = self.resampling_cache[cache_key]
-                if os.path.exists(cache_path):
-                    logger.debug(f"使用缓存的重采样文件: {cache_path}")
-                    return cache_path
-                else:
-                    # 缓存文件不存在，删除缓存项
-                    del self.resampling_cache[cache_key]
-                    
-            # 检查是否需要重采样
+            # 检查是否需要重采样，不需要时无需计算缓存键
             if framerate == target_rate:
                 logger.debug(f"不需要重采样: {input_file}")
                 return input_file
                 
+            # 构造缓存键，本地文件用inode、大小和修改时间标识内容，无需读取文件计算哈希
+            st = os.stat(input_file)
+            cache_key = f"{st.st_dev}_{st.st_ino}_{st.st_size}_{st.st_mtime_ns}_{framerate}_{target_rate}"
+            
             # 准备输出文件名
             if output_file is None:
                 basename = os.path.basename(input_file)
                 output_file = os.path.join(self.config["temp_dir"], f"resampled_{target_rate}_{basename}")
                 
+            # 检查缓存
+            cached = self.get_cached_array(cache_key)
+            if cached is not None:
+                logger.debug(f"使用缓存的重采样文件: {cache_key}")
+                return self._materialize(cache_key, output_file, *cached)
+                
             # 重采样
             logger.info(f"重采样文件从 {framerate}Hz 到 {target_rate}Hz: {input_file}")
             
-            # 读取原始WAV文件
-            rate, data = scipy.io.wavfile.read(input_file)
-            
-            # 计算重采样比例
-            resample_ratio = target_rate / rate
-            
-            # 计算新长度
-            new_length = int(len(data) * resample_ratio)
-            
-            # 使用scipy的重采样函数
-            resampled_data = scipy.signal.resample(data, new_length)
+            # 以内存映射方式读取原始WAV文件，由操作系统按需换入页面
+            try:
+                rate, data = scipy.io.wavfile.read(input_file, mmap=True)
+            except ValueError:
+                # 24位等格式不支持内存映射
+                rate, data = scipy.io.wavfile.read(input_file)
             
-            # 保存重采样后的WAV文件
-            scipy.io.wavfile.write(output_file, target_rate, resampled_data.astype(np.int16))
+            # 多相滤波重采样
+            resampled_data = self._resample(data, rate, target_rate)
             
-            # 添加到缓存
-            self._add_to_cache(cache_key, output_file)
+            # 添加到缓存并保存重采样后的WAV文件
+            resampled_data = self._to_int16(resampled_data)
+            self._add_to_cache(cache_key, resampled_data, target_rate)
+            output_file = self._materialize(cache_key, output_file, resampled_data, target_rate)
             
             logger.debug(f"重采样文件完成: {output_file}")
             return output_file
@@ -253,12 +637,15 @@ def resample_file(self, input_file: str, output_file: str = None, target_rate: i
             
     def clear_cache(self) -> None:
         """清理缓存"""
-        for cache_path in self.resampling_cache.values():
-            try:
-                if os.path.exists(cache_path):
-                    os.remove(cache_path)
-            except:
-                pass
+        with self.cache_lock:
+            cache_paths = list(self.cache_files.values())
+            self.resampling_cache.clear()
+            self.cache_files.clear()
+            self.cache_bytes = 0
+            
+        # 并行删除已写出的WAV文件，在慢速或网络文件系统上可减少等待时间
+        if cache_paths:
+            with ThreadPoolExecutor(max_workers=8) as executor:
+                list(executor.map(_unlink_quietly, cache_paths))
                 
-        self.resampling_cache.clear()
-        logger.info("缓存已清理") 
\ No newline at end of file
+        logger.info("缓存已清理")
@@ -7,20 +7,88 @@
 """
 
 import os
+import re
+import math
+import shutil
 import time
+import json
+import hashlib
 import datetime
 import wave
 import logging
 import threading
-import queue
 import tempfile
+from collections import deque
 import pyaudio
 import numpy as np
+import scipy.signal
 from typing import Dict, Any, Optional, List, Tuple
 
+from audio_processor import AudioProcessor
+
+# PortAudio没有对应设备的ALSA声卡通过alsaaudio直接读取
+have_alsaaudio = False
+try:
+    import alsaaudio
+    have_alsaaudio = True
+except ImportError:
+    pass
+
 # 配置日志
 logger = logging.getLogger('AudioRecorder')
 
+# arecord -l的输出格式，宽松模式只匹配声卡
+_ARECORD_FULL = re.compile(r'card\s+(\d+):\s+(\w+)\s+\[([^\]]+)\],\s+device\s+(\d+):\s+(\w+)\s+\[([^\]]+)\]')
+_ARECORD_LOOSE = re.compile(r'card\s+(\d+):\s+([^\n]+)')
+# PortAudio中ALSA设备名称里的声卡和设备号
+_HW_NAME = re.compile(r'hw:(\d+),(\d+)')
+
+class _RingBuffer:
+    """单生产者单消费者的int16环形缓冲区
+    
+    PortAudio回调线程只负责写入并推进写位置，录制线程只读取，无需加锁。
+    """
+    
+    def __init__(self, capacity: int):
+        """初始化环形缓冲区
+        
+        Args:
+            capacity: 容量，采样数
+        """
+        self.capacity = capacity
+        self.buffer = np.zeros(capacity, dtype=np.int16)
+        # 累计写入的采样数，写入数据后才更新
+        self.written = 0
+        
+    def push(self, samples: np.ndarray) -> None:
+        """写入采样数据
+        
+        Args:
+            samples: int16采样数组
+        """
+        n = len(samples)
+        if n > self.capacity:
+            samples = samples[-self.capacity:]
+        start = (self.written + n - len(samples)) % self.capacity
+        first = min(len(samples), self.capacity - start)
+        self.buffer[start:start + first] = samples[:first]
+        self.buffer[:len(samples) - first] = samples[first:]
+        self.written += n
+        
+    def read(self, position: int, n: int) -> np.ndarray:
+        """读取从累计位置position开始的n个采样
+        
+        Args:
+            position: 累计写入位置
+            n: 采样数，不超过容量
+            
+        Returns:
+            采样数组副本
+        """
+        start = position % self.capacity
+        first = min(n, self.capacity - start)
+        return np.concatenate((self.buffer[start:start + first], self.buffer[:n - first]))
+
 class AudioRecorder:
     """音频录制类"""
     
@@ -32,7 +100,7 @@ def __init__(self, config: Dict[str, Any] = None):
         """
         # 默认配置
         self.config = {
-            "chunk_size": 512,  # 每次读取的音频帧数
+            "chunk_size": 2048,  # 每次读取的音频帧数，44.1kHz下约46ms，减少回调和读取次数
             "audio_format": pyaudio.paInt16,  # 音频格式
             "channels": 1,  # 单声道
             "sample_rate": 44100,  # 采样率
@@ -40,13 +108,17 @@ def __init__(self, config: Dict[str, Any] = None):
             "advance_seconds": 0.2,  # 提前开始录制的时间
             "temp_dir": tempfile.gettempdir(),  # 临时文件目录
             "output_dir": "recordings",  # 录音输出目录
+            "spool_recordings": False,  # 录制过程中把原始音频逐块写入临时WAV文件，供save_audio_file直接移动
+            "output_sample_rate": 12000,  # 录制后降采样到FT8解码器使用的12kHz单声道，None则保持原样
+            # 设备列表缓存文件，None则每次都重新扫描
+            "device_cache_file": os.path.join(os.path.expanduser("~"), ".cache", "ft8pycli", "devices.json"),
         }
         
         # 更新配置
         if config:
             self.config.update(config)
             
-        # 创建输出目录
+        # 创建输出目录，保存录音时不再逐个检查
         os.makedirs(self.config["output_dir"], exist_ok=True)
         
         # 初始化PyAudio
@@ -60,7 +132,12 @@ def __init__(self, config: Dict[str, Any] = None):
             self.recording = False
             self.stop_event = threading.Event()
             self.record_thread = None
-            self.buffer_queue = queue.Queue(maxsize=8)  # 音频缓冲队列
+            # 音频缓冲队列，单生产者单消费者，deque的append/popleft本身是原子的，无需加锁
+            # 消费者跟不上时丢弃最旧的周期
+            self.buffer_queue = deque(maxlen=8)
+            self._buffer_evt = threading.Event()  # 有新数据时唤醒消费者
+            self.record_buffer = None  # 预分配的录音缓冲区，按需扩容
+            self.ring_buffer = None  # PyAudio回调模式写入的环形缓冲区
             
             logger.info("音频录制器初始化完成")
         except Exception as e:
@@ -76,60 +153,141 @@ def __del__(self):
     def _get_audio_devices(self) -> List[Dict[str, Any]]:
         """获取可用的音频设备
         
+        设备列表和探测到的采样率缓存在磁盘上，硬件未变化时直接使用缓存，
+        避免每次启动都打开测试流和逐个探测采样率。
+        
         Returns:
             设备列表
         """
-        devices = []
-        logger.debug(f"开始扫描音频设备，总数: {self.pyaudio.get_device_count()}")
+        alsa_output = self._list_alsa_devices()
+        fingerprint = self._device_fingerprint(alsa_output)
+        
+        devices = self._load_device_cache(fingerprint)
+        if devices is not None:
+            logger.info(f"使用缓存的音频设备列表，共 {len(devices)} 个音频输入设备")
+            return devices
+            
+        devices = self._scan_audio_devices(alsa_output)
+        self._save_device_cache(fingerprint, devices)
+        return devices
         
-        # 首先获取ALSA设备列表
+    def _list_alsa_devices(self) -> Optional[str]:
+        """运行arecord -l获取ALSA输入设备列表
+        
+        Returns:
+            arecord的输出，不可用时返回None
+        """
         try:
             import subprocess
-            # 使用arecord -l获取输入设备列表
             result = subprocess.run(["arecord", "-l"], capture_output=True, text=True)
             if result.returncode == 0:
-                output = result.stdout
-                # 查找所有声卡设备
-                import re
-                # 修改正则表达式以匹配arecord -l的输出格式
-                card_devices = re.findall(r'card\s+(\d+):\s+(\w+)\s+\[([^\]]+)\],\s+device\s+(\d+):\s+(\w+)\s+\[([^\]]+)\]', output)
+                return result.stdout
+        except Exception as e:
+            logger.debug(f"arecord不可用: {e}")
+        return None
+        
+    def _device_fingerprint(self, alsa_output: Optional[str]) -> str:
+        """计算音频硬件的指纹
+        
+        只使用arecord输出和PortAudio的设备信息，不打开任何设备。
+        
+        Args:
+            alsa_output: arecord -l的输出
+            
+        Returns:
+            指纹字符串
+        """
+        # 是否安装alsaaudio决定了PortAudio之外的声卡是否列出
+        h = hashlib.sha1(f"alsaaudio={have_alsaaudio}\n".encode())
+        h.update((alsa_output or "").encode())
+        for i in range(self.pyaudio.get_device_count()):
+            try:
+                info = self.pyaudio.get_device_info_by_index(i)
+                h.update(f"{i}|{info['name']}|{info['maxInputChannels']}|{info['defaultSampleRate']}\n".encode())
+            except Exception:
+                h.update(f"{i}|?\n".encode())
+        return h.hexdigest()
+        
+    def _load_device_cache(self, fingerprint: str) -> Optional[List[Dict[str, Any]]]:
+        """读取缓存的设备列表
+        
+        Args:
+            fingerprint: 当前硬件指纹
+            
+        Returns:
+            设备列表，缓存无效时返回None
+        """
+        cache_file = self.config["device_cache_file"]
+        if not cache_file or not os.path.exists(cache_file):
+            return None
+            
+        try:
+            # 声卡热插拔后/proc/asound/cards会更新
+            if os.path.exists("/proc/asound/cards") and \
+                    os.path.getmtime("/proc/asound/cards") > os.path.getmtime(cache_file):
+                return None
                 
-                # 添加ALSA设备
+            with open(cache_file, 'r') as f:
+                cache = json.load(f)
+            if cache.get("fingerprint") != fingerprint:
+                return None
+            return cache["devices"]
+        except Exception as e:
+            logger.debug(f"读取设备缓存失败: {e}")
+            return None
+            
+    def _save_device_cache(self, fingerprint: str, devices: List[Dict[str, Any]]) -> None:
+        """保存设备列表到缓存文件
+        
+        Args:
+            fingerprint: 当前硬件指纹
+            devices: 设备列表
+        """
+        cache_file = self.config["device_cache_file"]
+        if not cache_file:
+            return
+            
+        try:
+            os.makedirs(os.path.dirname(cache_file), exist_ok=True)
+            tmp_file = f"{cache_file}.{os.getpid()}.tmp"
+            with open(tmp_file, 'w') as f:
+                json.dump({"fingerprint": fingerprint, "devices": devices}, f)
+            os.replace(tmp_file, cache_file)
+        except Exception as e:
+            logger.debug(f"保存设备缓存失败: {e}")
+            
+    def _scan_audio_devices(self, alsa_output: Optional[str]) -> List[Dict[str, Any]]:
+        """扫描可用的音频设备
+        
+        Args:
+            alsa_output: arecord -l的输出
+            
+        Returns:
+            设备列表
+        """
+        devices = []
+        logger.debug(f"开始扫描音频设备，总数: {self.pyaudio.get_device_count()}")
+        
+        # 首先解析ALSA设备列表，用于把声卡关联到PyAudio设备
+        alsa_cards = []
+        try:
+            if alsa_output:
+                card_devices = _ARECORD_FULL.findall(alsa_output)
                 for card_id, card_name, card_desc, device_id, device_name, device_desc in card_devices:
-                    device_name = f"{card_desc} (hw:{card_id},{device_id})"
-                    devices.append({
-                        "index": len(devices),  # 使用当前列表长度作为索引
-                        "name": device_name,
-                        "channels": 1,  # 默认单声道
-                        "default_sample_rate": 44100,
-                        "supported_rates": [44100, 48000],
-                        "is_alsa": True,
-                        "card_id": int(card_id),
-                        "device_id": int(device_id)
-                    })
-                    logger.debug(f"添加ALSA设备: {device_name}")
+                    alsa_cards.append((int(card_id), int(device_id), card_desc))
                     
                 # 如果没有找到设备，尝试使用更宽松的匹配模式
-                if not devices:
+                if not alsa_cards:
                     logger.warning("使用更宽松的匹配模式查找设备")
-                    card_devices = re.findall(r'card\s+(\d+):\s+([^\n]+)', output)
-                    for card_id, card_desc in card_devices:
+                    for card_id, card_desc in _ARECORD_LOOSE.findall(alsa_output):
                         if "USB" in card_desc:
-                            device_name = f"{card_desc} (hw:{card_id},0)"
-                            devices.append({
-                                "index": len(devices),
-                                "name": device_name,
-                                "channels": 1,
-                                "default_sample_rate": 44100,
-                                "supported_rates": [44100, 48000],
-                                "is_alsa": True,
-                                "card_id": int(card_id),
-                                "device_id": 0
-                            })
-                            logger.debug(f"添加USB设备: {device_name}")
+                            alsa_cards.append((int(card_id), 0, card_desc))
         except Exception as e:
             logger.error(f"获取ALSA设备列表失败: {e}")
         
+        # PyAudio中已有的ALSA声卡，名称形如 "USB Audio CODEC: - (hw:1,0)"
+        matched = set()
+        
         # 然后获取PyAudio设备
         for i in range(self.pyaudio.get_device_count()):
             try:
@@ -153,29 +311,8 @@ def _get_audio_devices(self) -> List[Dict[str, Any]]:
                 
                 # 检查是否为输入设备
                 if device_info["maxInputChannels"] > 0:
-                    # 检查设备支持的采样率
-                    try:
-                        supported_rates = []
-                        for rate in [8000, 11025, 16000, 22050, 44100, 48000, 96000]:
-                            try:
-                                if self.pyaudio.is_format_supported(
-                                    rate,
-                                    input_device=i,
-                                    input_channels=1,
-                                    input_format=self.config["audio_format"]
-                                ):
-                                    supported_rates.append(rate)
-                            except:
-                                pass
-                        
-                        # 如果没有检测到支持的采样率，使用默认采样率
-                        if not supported_rates:
-                            supported_rates = [int(device_info["defaultSampleRate"])]
-                            logger.warning(f"设备 {i} ({device_info['name']}) 没有检测到支持的采样率，使用默认值: {supported_rates}")
-                        
-                    except Exception as e:
-                        logger.warning(f"设备 {i} 检测支持的采样率失败: {e}")
-                        supported_rates = [44100, 48000]  # 默认假设支持这些常用采样率
+                    # 只记录默认采样率，其他采样率在打开设备时按需探测
+                    supported_rates = [int(device_info["defaultSampleRate"])]
                     
                     # 添加设备
                     devices.append({
@@ -187,11 +324,34 @@ def _get_audio_devices(self) -> List[Dict[str, Any]]:
                         "is_alsa": False,
                         "pyaudio_index": i
                     })
+                    hw = _HW_NAME.search(device_info["name"])
+                    if hw:
+                        matched.add((int(hw.group(1)), int(hw.group(2))))
                     logger.debug(f"找到PyAudio输入设备 {i}: {device_info['name']}, 通道数: {device_info['maxInputChannels']}, 支持的采样率: {supported_rates}")
                 else:
                     logger.debug(f"设备 {i} ({device_info['name']}) 不是输入设备，跳过")
             except Exception as e:
                 logger.error(f"获取设备 {i} 信息时出错: {e}")
+                
+        # PortAudio没有对应设备的声卡，通过alsaaudio直接打开
+        for card_id, device_id, card_desc in alsa_cards:
+            if (card_id, device_id) in matched:
+                continue
+            if not have_alsaaudio:
+                logger.warning(f"声卡 {card_desc} (hw:{card_id},{device_id}) 没有对应的PyAudio设备，且未安装alsaaudio，跳过")
+                continue
+            device_name = f"{card_desc} (hw:{card_id},{device_id})"
+            devices.append({
+                "index": len(devices),
+                "name": device_name,
+                "channels": 1,  # 默认单声道
+                "default_sample_rate": 44100,
+                "supported_rates": [44100, 48000],
+                "is_alsa": True,
+                "card_id": card_id,
+                "device_id": device_id
+            })
+            logger.debug(f"添加ALSA设备: {device_name}")
         
         logger.info(f"找到 {len(devices)} 个音频输入设备")
         return devices
@@ -231,6 +391,8 @@ def open_device(self, device_index: int) -> bool:
             
         # 检查是否支持配置的采样率
         sample_rate = self.config["sample_rate"]
+        if sample_rate not in device["supported_rates"] and self._probe_rate(device, sample_rate):
+            device["supported_rates"].append(sample_rate)
         if sample_rate not in device["supported_rates"]:
             # 尝试使用设备的默认采样率
             sample_rate = device["default_sample_rate"]
@@ -244,27 +406,16 @@ def open_device(self, device_index: int) -> bool:
             
         try:
             if device.get("is_alsa", False):
-                # 使用ALSA设备
-                try:
-                    import subprocess
-                    # 使用arecord命令测试设备
-                    test_cmd = [
-                        "arecord",
-                        "-D", f"hw:{device['card_id']},{device['device_id']}",
-                        "-f", "S16_LE",
-                        "-r", str(sample_rate),
-                        "-c", "1",
-                        "-t", "raw",
-                        "-d", "1",
-                        "/dev/null"
-                    ]
-                    result = subprocess.run(test_cmd, capture_output=True)
-                    if result.returncode != 0:
-                        logger.error(f"ALSA设备验证失败: {result.stderr.decode()}")
-                        return False
-                except Exception as e:
-                    logger.error(f"ALSA设备验证失败: {e}")
-                    return False
+                # 直接打开ALSA采集设备，打开失败会抛出ALSAAudioError
+                self.stream = alsaaudio.PCM(
+                    alsaaudio.PCM_CAPTURE,
+                    alsaaudio.PCM_NORMAL,
+                    device=f"hw:{device['card_id']},{device['device_id']}",
+                    channels=self.config["channels"],
+                    rate=sample_rate,
+                    format=alsaaudio.PCM_FORMAT_S16_LE,
+                    periodsize=self.config["chunk_size"]
+                )
             else:
                 # 使用PyAudio设备
                 try:
@@ -280,41 +431,20 @@ def open_device(self, device_index: int) -> bool:
                 except Exception as e:
                     logger.error(f"PyAudio设备验证失败: {e}")
                     return False
-                
-            # 打开音频流
-            if device.get("is_alsa", False):
-                # 使用ALSA设备
-                import subprocess
-                self.stream = subprocess.Popen(
-                    [
-                        "arecord",
-                        "-D", f"hw:{device['card_id']},{device['device_id']}",
-                        "-f", "S16_LE",
-                        "-r", str(sample_rate),
-                        "-c", "1",
-                        "-t", "raw"
-                    ],
-                    stdout=subprocess.PIPE,
-                    stderr=subprocess.PIPE
-                )
-            else:
-                # 使用PyAudio设备
+                    
+                # 回调模式下PortAudio线程直接写入环形缓冲区
+                self.ring_buffer = _RingBuffer(sample_rate * self.config["channels"] * 20)
                 self.stream = self.pyaudio.open(
                     format=self.config["audio_format"],
                     channels=self.config["channels"],
                     rate=sample_rate,
                     input=True,
                     input_device_index=device["pyaudio_index"],
-                    frames_per_buffer=self.config["chunk_size"]
+                    frames_per_buffer=self.config["chunk_size"],
+                    stream_callback=self._stream_callback
                 )
                 
-            # 验证流是否成功打开
-            if device.get("is_alsa", False):
-                if self.stream.poll() is not None:
-                    logger.error("ALSA音频流未激活")
-                    self.close_device()
-                    return False
-            else:
+                # 验证流是否成功打开
                 if not self.stream.is_active():
                     logger.error("PyAudio音频流未激活")
                     self.close_device()
@@ -329,14 +459,36 @@ def open_device(self, device_index: int) -> bool:
             self.close_device()
             return False
             
+    def _probe_rate(self, device: Dict[str, Any], rate: int) -> bool:
+        """探测PyAudio设备是否支持指定采样率
+        
+        Args:
+            device: 设备信息
+            rate: 采样率
+            
+        Returns:
+            是否支持
+        """
+        if device.get("is_alsa", False):
+            return False
+            
+        try:
+            return bool(self.pyaudio.is_format_supported(
+                rate,
+                input_device=device["pyaudio_index"],
+                input_channels=1,
+                input_format=self.config["audio_format"]
+            ))
+        except Exception:
+            return False
+            
     def close_device(self) -> None:
         """关闭当前音频设备"""
         if self.stream:
             try:
                 if self.active_device and self.active_device.get("is_alsa", False):
                     # 关闭ALSA设备
-                    self.stream.terminate()
-                    self.stream.wait()
+                    self.stream.close()
                 else:
                     # 关闭PyAudio设备
                     self.stream.stop_stream()
@@ -363,6 +515,7 @@ def start_recording(self) -> bool:
             
         # 重置停止事件
         self.stop_event.clear()
+        self._buffer_evt.clear()
         self.recording = True
         
         # 启动录制线程
@@ -375,6 +528,9 @@ def start_recording(self) -> bool:
         
     def stop(self) -> None:
         """停止录制"""
+        # 唤醒在get_next_audio中等待的消费者，使其立即检查停止标志
+        self._buffer_evt.set()
+        
         if not self.recording:
             return
             
@@ -399,18 +555,19 @@ def _record_thread(self) -> None:
                 cycle_start_str = next_cycle.strftime("%H:%M:%S")
                 logger.info(f"等待 {(next_cycle - datetime.datetime.now()).total_seconds():.3f} 秒到下一个FT8周期 {cycle_start_str}...")
                 
-                while datetime.datetime.now() < next_cycle - datetime.timedelta(seconds=self.config["advance_seconds"]):
-                    if self.stop_event.is_set() or not self.recording:
-                        return
-                    time.sleep(0.1)
+                # 等待到周期开始前advance_seconds，停止时立即返回
+                delay = (next_cycle - datetime.datetime.now()).total_seconds() - self.config["advance_seconds"]
+                if self.stop_event.wait(timeout=max(0, delay)) or not self.recording:
+                    return
                     
                 # 开始录制
                 logger.info(f"录制中... FT8周期开始于 {cycle_start_str}")
                 audio_data = self._record_audio(next_cycle)
                 
-                if audio_data and audio_data.get("frames"):
+                if audio_data and len(audio_data["samples"]):
                     # 将录制的数据放入队列
-                    self.buffer_queue.put(audio_data)
+                    self.buffer_queue.append(audio_data)
+                    self._buffer_evt.set()
                     
             except Exception as e:
                 logger.error(f"录制线程出错: {e}")
@@ -424,28 +581,21 @@ def _wait_for_next_ft8_cycle(self) -> datetime.datetime:
         Returns:
             下一个周期开始时间
         """
-        now = datetime.datetime.now()
-        minute = now.minute
-        second = now.second
+        # FT8周期每15秒一次: 00, 15, 30, 45，按纪元秒取整，跨时/日/年边界也正确
+        now_ts = time.time()
+        next_ts = math.ceil(now_ts / 15.0) * 15.0
+        if next_ts <= now_ts:
+            next_ts += 15.0
+        return datetime.datetime.fromtimestamp(next_ts)
         
-        # FT8周期每15秒一次: 00, 15, 30, 45
-        next_second = (second // 15) * 15 + 15
-        
-        # 处理进位
-        if next_second >= 60:
-            next_second = 0
-            minute += 1
-            
-        if minute >= 60:
-            minute = 0
-            
-        next_cycle = now.replace(minute=minute, second=next_second, microsecond=0)
+    def _stream_callback(self, in_data, frame_count, time_info, status):
+        """PyAudio回调，在PortAudio线程中执行
         
-        # 如果计算的时间已经过去，加15秒
-        if next_cycle <= now:
-            next_cycle += datetime.timedelta(seconds=15)
-            
-        return next_cycle
+        Returns:
+            (输出数据, 继续标志)
+        """
+        self.ring_buffer.push(np.frombuffer(in_data, dtype=np.int16))
+        return (None, pyaudio.paContinue)
         
     def _record_audio(self, cycle_start: datetime.datetime) -> Dict[str, Any]:
         """录制音频
@@ -454,12 +604,14 @@ def _record_audio(self, cycle_start: datetime.datetime) -> Dict[str, Any]:
             cycle_start: 周期开始时间
             
         Returns:
-            录制的音频数据
+            录制的音频数据，失败时返回None。其中的"wav_file"临时文件归调用方所有，
+            需调用save_audio_file移走，或在不保存时自行删除
         """
         if not self.stream or not self.active_device:
             logger.error("未打开音频设备")
             return None
             
+        spool_file = None
         try:
             # 准备录制参数
             CHUNK = self.config["chunk_size"]
@@ -468,45 +620,44 @@ def _record_audio(self, cycle_start: datetime.datetime) -> Dict[str, Any]:
             RATE = self.config["sample_rate"]
             RECORD_SECONDS = self.config["record_seconds"]
             
-            frames = []
-            frame_count = 0
-            
             # 计算总帧数
             total_frames = int(RATE / CHUNK * RECORD_SECONDS)
             
-            # 使用绝对时间控制录制结束
-            record_start = time.time()
-            record_end_time = record_start + RECORD_SECONDS
+            # 需要保存录音时，周期开始就打开WAV文件，录制过程中逐块写入原始音频
+            spool = None
+            if self.config["spool_recordings"]:
+                fd, spool_file = tempfile.mkstemp(prefix="capture_", suffix=".wav", dir=self.config["temp_dir"])
+                os.close(fd)
+                spool = wave.open(spool_file, 'wb')
+                spool.setnchannels(CHANNELS)
+                spool.setsampwidth(self.pyaudio.get_sample_size(FORMAT))
+                spool.setframerate(RATE)
+                
+            # 使用单调时钟控制录制结束，不受系统时间调整影响
+            record_start_ns = time.monotonic_ns()
+            record_end_ns = record_start_ns + int(RECORD_SECONDS * 1e9)
             
-            # 录制音频
-            while time.time() < record_end_time and frame_count < total_frames:
-                if self.stop_event.is_set() or not self.recording:
-                    break
-                    
-                try:
-                    # 计算剩余时间
-                    remaining = record_end_time - time.time()
-                    if remaining <= 0:
-                        break
-                        
-                    # 读取一块音频数据
-                    if self.active_device.get("is_alsa", False):
-                        # 从ALSA设备读取数据
-                        data = self.stream.stdout.read(CHUNK * 2)  # 16位采样，每个样本2字节
-                        if not data:
-                            break
-                    else:
-                        # 从PyAudio设备读取数据
-                        data = self.stream.read(CHUNK, exception_on_overflow=False)
-                        
-                    frames.append(data)
-                    frame_count += 1
-                except Exception as e:
-                    logger.error(f"读取音频数据出错: {e}")
-                    time.sleep(0.001)  # 短暂休息避免CPU过载
-                    continue  # 错误后继续尝试读取
+            try:
+                if self.active_device.get("is_alsa", False):
+                    samples, frame_count = self._read_alsa(total_frames, record_end_ns, spool)
+                else:
+                    samples, frame_count = self._read_ring(total_frames, record_end_ns, spool)
+            finally:
+                if spool:
+                    # 关闭时只需回填RIFF头中的长度
+                    spool.close()
                     
-            actual_record_time = time.time() - record_start
+            actual_record_time = (time.monotonic_ns() - record_start_ns) / 1e9
+            
+            # 录制完成后只做一次降采样和混音，后续保存、重采样和解码的数据量都随之减少
+            output_rate = self.config["output_sample_rate"]
+            samples_f32 = None
+            if output_rate and len(samples) and (RATE != output_rate or CHANNELS > 1):
+                samples, samples_f32 = self._to_output_rate(samples, RATE, CHANNELS, output_rate)
+                RATE, CHANNELS = output_rate, 1
+            elif self.record_buffer is not None and np.shares_memory(samples, self.record_buffer):
+                # 预分配的缓冲区在下个周期复用，未生成新数组时才需要复制
+                samples = samples.copy()
             
             # 只要获取了一定比例的数据就可以继续处理
             if frame_count < total_frames * 0.7:  # 70%
@@ -522,8 +673,8 @@ def _record_audio(self, cycle_start: datetime.datetime) -> Dict[str, Any]:
             timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
             cycle_start_str = cycle_start.strftime("%Y%m%d_%H%M%S")
             
-            return {
-                "frames": frames,
+            audio_data = {
+                "samples": samples,
                 "frame_count": frame_count,
                 "total_frames": total_frames,
                 "timestamp": timestamp,
@@ -533,13 +684,160 @@ def _record_audio(self, cycle_start: datetime.datetime) -> Dict[str, Any]:
                 "sample_width": self.pyaudio.get_sample_size(FORMAT),
                 "format": FORMAT,
                 "actual_duration": actual_record_time,
-                "device": self.active_device
+                "device": self.active_device,
+                # 每个设备每个FT8周期只录制一次，可作为稳定的内容标识
+                "content_id": f"{cycle_start_str}_{self.active_device['index']}",
+                # 与samples数值相同的float32数组(降采样时顺带得到，否则为None)，
+                # AudioProcessor再次重采样时直接使用，无需从int16重新转换
+                "samples_f32": samples_f32,
+                # 录制时写入的原始音频WAV文件，未启用spool_recordings时为None
+                "wav_file": spool_file
             }
+            # 临时文件已交给调用方
+            spool_file = None
+            return audio_data
             
         except Exception as e:
             logger.error(f"录制音频出错: {e}")
             return None
+        finally:
+            # 未交给调用方就返回时(出错或数据太少)，删除录制中写入的临时文件
+            if spool_file:
+                try:
+                    os.remove(spool_file)
+                except OSError:
+                    pass
+            
+    def _to_output_rate(self, samples: np.ndarray, rate: int, channels: int,
+                        output_rate: int) -> Tuple[np.ndarray, np.ndarray]:
+        """混为单声道并重采样到输出采样率
+        
+        Args:
+            samples: 交错排列的int16采样数组
+            rate: 录制采样率
+            channels: 通道数
+            output_rate: 输出采样率
+            
+        Returns:
+            (int16单声道采样数组, 取整限幅后数值与之相同的float32数组)
+        """
+        data = samples.astype(np.float32)
+        if channels > 1:
+            data = data.reshape(-1, channels).mean(axis=1)
+            
+        if rate != output_rate:
+            # 44100 -> 12000 即 up=40, down=147，滤波器与AudioProcessor共用缓存
+            up, down, h = AudioProcessor.resample_filter(rate, output_rate)
+            data = scipy.signal.resample_poly(data, up, down, window=h)
+            
+        np.rint(data, out=data)
+        np.clip(data, -32768, 32767, out=data)
+        return data.astype(np.int16), data
+        
+    def _read_ring(self, total_frames: int, record_end_ns: int,
+                   spool: Optional[wave.Wave_write] = None) -> Tuple[np.ndarray, int]:
+        """从PyAudio回调写入的环形缓冲区取出一段录音
+        
+        Args:
+            total_frames: 期望的块数
+            record_end_ns: 录制结束的单调时钟时间，纳秒
+            spool: 录制过程中逐块写入的WAV文件
+            
+        Returns:
+            (采样数组, 实际块数)
+        """
+        chunk_samples = self.config["chunk_size"] * self.config["channels"]
+        target = total_frames * chunk_samples
+        start = self.ring_buffer.written
+        position = start
+        
+        # 等待录制时长结束，回调线程在此期间持续写入；需要写文件时每秒唤醒一次写入新数据
+        while True:
+            remaining = (record_end_ns - time.monotonic_ns()) / 1e9
+            if remaining <= 0 or self.stop_event.wait(min(remaining, 1.0) if spool else remaining):
+                break
+            if spool:
+                position = self._spool_ring(spool, position, start + target)
+        
+        # 回调按块交付数据，稍等最后一块到达
+        deadline_ns = time.monotonic_ns() + 500_000_000
+        while (self.ring_buffer.written - start < target and time.monotonic_ns() < deadline_ns
+               and not self.stop_event.is_set()):
+            time.sleep(0.01)
+            
+        n = min(self.ring_buffer.written - start, target)
+        if spool:
+            self._spool_ring(spool, position, start + n)
+        return self.ring_buffer.read(start, n), n // chunk_samples
+        
+    def _spool_ring(self, spool: wave.Wave_write, position: int, end: int) -> int:
+        """把环形缓冲区中position之后新写入的数据追加到WAV文件
+        
+        Args:
+            spool: WAV文件
+            position: 已写入文件的累计位置
+            end: 最多写到的累计位置
             
+        Returns:
+            新的累计位置
+        """
+        n = min(self.ring_buffer.written, end) - position
+        if n > 0:
+            # writeframesraw不在每次写入时更新头部的帧数
+            spool.writeframesraw(self.ring_buffer.read(position, n))
+            position += n
+        return position
+        
+    def _read_alsa(self, total_frames: int, record_end_ns: int,
+                   spool: Optional[wave.Wave_write] = None) -> Tuple[np.ndarray, int]:
+        """从alsaaudio采集设备循环读取一段录音
+        
+        Args:
+            total_frames: 期望的块数
+            record_end_ns: 录制结束的单调时钟时间，纳秒
+            spool: 录制过程中逐块写入的WAV文件
+            
+        Returns:
+            (采样数组, 实际块数)
+        """
+        CHUNK = self.config["chunk_size"]
+        CHANNELS = self.config["channels"]
+        frame_count = 0
+        
+        # 预分配整段录音的int16缓冲区，每块数据直接复制到对应位置
+        buffer_len = total_frames * CHUNK * CHANNELS
+        if self.record_buffer is None or len(self.record_buffer) < buffer_len:
+            self.record_buffer = np.empty(buffer_len, dtype=np.int16)
+        buffer = self.record_buffer
+        # 按字节访问同一块内存，读到的数据直接复制进去，无需先构造数组
+        buffer_bytes = memoryview(buffer).cast('B')
+        sample_count = 0
+        
+        while time.monotonic_ns() < record_end_ns and frame_count < total_frames:
+            if self.stop_event.is_set() or not self.recording:
+                break
+                
+            try:
+                # 阻塞读取一个周期的数据，16位采样
+                length, data = self.stream.read()
+                if length <= 0:
+                    # 溢出时返回负的错误码，alsaaudio会自动恢复
+                    continue
+                    
+                n = min(len(data) // 2, buffer_len - sample_count)
+                buffer_bytes[sample_count * 2:(sample_count + n) * 2] = memoryview(data)[:n * 2]
+                if spool:
+                    spool.writeframesraw(buffer[sample_count:sample_count + n])
+                sample_count += n
+                frame_count += 1
+            except Exception as e:
+                logger.error(f"读取音频数据出错: {e}")
+                time.sleep(0.001)  # 短暂休息避免CPU过载
+                continue  # 错误后继续尝试读取
+                
+        # 返回缓冲区的视图，下个周期开始前有效，由调用方决定是否复制
+        return buffer[:sample_count], frame_count
+        
     def save_audio_file(self, audio_data: Dict[str, Any], filename: str = None) -> Optional[str]:
         """保存音频数据为WAV文件
         
@@ -550,31 +848,36 @@ def save_audio_file(self, audio_data: Dict[str, Any], filename: str = None) -> O
         Returns:
             保存的文件路径
         """
-        if not audio_data or not audio_data.get("frames"):
+        if not audio_data or not len(audio_data.get("samples", ())):
             return None
             
         try:
             # 准备文件名
             if not filename:
-                timestamp = audio_data.get("timestamp", datetime.datetime.now().strftime("%Y%m%d_%H%M%S"))
+                timestamp = audio_data.get("timestamp") or datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
                 filename = f"recording_{timestamp}.wav"
                 
             # 确保文件扩展名正确
             if not filename.lower().endswith(".wav"):
                 filename += ".wav"
                 
-            # 确保输出目录存在
-            os.makedirs(self.config["output_dir"], exist_ok=True)
-                
             # 准备文件路径
             filepath = os.path.join(self.config["output_dir"], filename)
             
-            # 保存WAV文件
-            with wave.open(filepath, 'wb') as wf:
+            # 录制时已写好原始音频文件的，直接移动过去
+            if audio_data.get("wav_file") and os.path.exists(audio_data["wav_file"]):
+                shutil.move(audio_data["wav_file"], filepath)
+                audio_data["wav_file"] = filepath
+                logger.info(f"保存音频文件: {filepath}")
+                return filepath
+                
+            # 保存WAV文件，大缓冲区下文件头和数据合并为一两次写入
+            # writeframesraw不预先计算帧数，关闭时回填文件头
+            with open(filepath, 'wb', buffering=1 << 20) as f, wave.open(f, 'wb') as wf:
                 wf.setnchannels(audio_data["channels"])
                 wf.setsampwidth(audio_data["sample_width"])
                 wf.setframerate(audio_data["sample_rate"])
-                wf.writeframes(b''.join(audio_data["frames"]))
+                wf.writeframesraw(audio_data["samples"])
                 
             logger.info(f"保存音频文件: {filepath}")
             return filepath
@@ -582,18 +885,22 @@ def save_audio_file(self, audio_data: Dict[str, Any], filename: str = None) -> O
             logger.error(f"保存音频文件出错: {e}")
             return None
             
-    def get_next_audio(self, timeout: float = 1.0) -> Optional[Dict[str, Any]]:
+    def get_next_audio(self, timeout: Optional[float] = 1.0) -> Optional[Dict[str, Any]]:
         """从缓冲队列获取下一个音频数据
         
         Args:
-            timeout: 超时时间，秒
+            timeout: 超时时间，秒，None表示一直等待直到有新数据或调用stop()
             
         Returns:
             音频数据，如果队列为空则返回None
         """
+        if not self.buffer_queue:
+            self._buffer_evt.wait(timeout)
+        # 先清除事件再取数据，取出之后写入的数据会重新设置事件
+        self._buffer_evt.clear()
         try:
-            return self.buffer_queue.get(timeout=timeout)
-        except queue.Empty:
+            return self.buffer_queue.popleft()
+        except IndexError:
             return None
     
     def is_buffer_empty(self) -> bool:
@@ -602,7 +909,7 @@ def is_buffer_empty(self) -> bool:
         Returns:
             是否为空
         """
-        return self.buffer_queue.empty()
+        return not self.buffer_queue
         
     def get_buffer_size(self) -> int:
         """获取缓冲队列大小
@@ -610,4 +917,4 @@ def get_buffer_size(self) -> int:
         Returns:
             队列大小
         """
-        return self.buffer_queue.qsize() 
\ No newline at end of file
+        return len(self.buffer_queue) 
\ No newline at end of file
@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+解码结果缓存模块
+
+按WAV文件内容缓存解码结果，重复批量解码同一目录时跳过未变化的文件。
+最近使用的结果保存在内存中，全部结果保存在SQLite数据库中，程序重启后仍可命中。
+"""
+
+import json
+import sqlite3
+import hashlib
+import logging
+import datetime
+import threading
+from collections import OrderedDict
+from typing import List, Optional
+
+from ft8_decoder import Msg
+
+logger = logging.getLogger('DecodeCache')
+
+class DecodeCache:
+    """解码结果缓存"""
+
+    def __init__(self, db_path: Optional[str] = None, signature: str = "", maxsize: int = 256):
+        """初始化解码结果缓存
+
+        Args:
+            db_path: SQLite数据库路径，为None时只使用内存缓存
+            signature: 解码环境标识(解码器版本、采样率等)，参与缓存键计算，
+                变化后旧结果自然失效
+            maxsize: 内存缓存的最大条目数
+        """
+        self.signature = signature.encode("utf-8")
+        self.maxsize = maxsize
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._db = None
+
+        if db_path:
+            try:
+                self._db = sqlite3.connect(db_path, check_same_thread=False)
+                self._db.execute("CREATE TABLE IF NOT EXISTS decode_cache "
+                                 "(key TEXT PRIMARY KEY, messages TEXT NOT NULL)")
+                self._db.commit()
+            except sqlite3.Error as e:
+                logger.warning(f"无法打开解码缓存数据库: {db_path}, 错误: {e}")
+                self._db = None
+
+    def file_key(self, path: str) -> Optional[str]:
+        """计算文件的缓存键
+
+        对整个文件内容计算blake2b，15秒的12kHz录音只有约360KB，开销远小于解码。
+
+        Args:
+            path: WAV文件路径
+
+        Returns:
+            缓存键，文件无法读取时返回None
+        """
+        hasher = hashlib.blake2b(self.signature, digest_size=16)
+        try:
+            with open(path, "rb") as f:
+                for block in iter(lambda: f.read(1 << 20), b""):
+                    hasher.update(block)
+        except OSError:
+            return None
+        return hasher.hexdigest()
+
+    def get(self, key: str) -> Optional[List[Msg]]:
+        """查找缓存的解码结果
+
+        缓存中保存的是首次解码的结果，返回时把每条消息的time字段改为当前时间，
+        与重新解码得到的结果一致。
+
+        Args:
+            key: 缓存键
+
+        Returns:
+            解码结果列表，未命中则返回None
+        """
+        with self._lock:
+            messages = self._memory.get(key)
+            if messages is not None:
+                self._memory.move_to_end(key)
+            elif self._db is not None:
+                row = self._db.execute("SELECT messages FROM decode_cache WHERE key = ?", (key,)).fetchone()
+                if row is not None:
+                    messages = [Msg(*fields) for fields in json.loads(row[0])]
+                    self._remember(key, messages)
+
+        if messages is None:
+            return None
+        now = datetime.datetime.now().strftime("%H:%M:%S")
+        return [msg._replace(time=now) for msg in messages]
+
+    def put(self, key: str, messages: List[Msg]) -> None:
+        """保存解码结果
+
+        数据库写入在commit()时才提交，批量解码结束后统一提交一次。
+
+        Args:
+            key: 缓存键
+            messages: 解码结果列表
+        """
+        with self._lock:
+            self._remember(key, messages)
+            if self._db is not None:
+                self._db.execute("INSERT OR REPLACE INTO decode_cache (key, messages) VALUES (?, ?)",
+                                 (key, json.dumps(messages, ensure_ascii=False)))
+
+    def _remember(self, key: str, messages: List[Msg]) -> None:
+        """加入内存缓存，超出容量时淘汰最近最少使用的条目，调用方需持有锁
+
+        Args:
+            key: 缓存键
+            messages: 解码结果列表
+        """
+        self._memory[key] = messages
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.maxsize:
+            self._memory.popitem(last=False)
+
+    def commit(self) -> None:
+        """提交数据库写入"""
+        with self._lock:
+            if self._db is not None:
+                try:
+                    self._db.commit()
+                except sqlite3.Error as e:
+                    logger.warning(f"保存解码缓存失败: {e}")
+
+    def close(self) -> None:
+        """提交并关闭数据库"""
+        self.commit()
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
@@ -1455,6 +1455,7 @@ def __init__(self, msg):
         self.bits77 = None
         self.decode_time = None # unix time of decode
         self.minute = None # cycle number
+        self.pass_ = None # which decoding pass found it
         self.start = None # sample number
         self.dt = None # dt in seconds
         self.hint = None
@@ -2348,6 +2349,7 @@ def process0a(self, samples, thunk, min_hz, max_hz, start_pad,
                     pass_got_some = True
                     dec.dt = ((dec.start - start_pad) / float(self.jrate))
                     dec.minute = samples_minute
+                    dec.pass_ = pass_
                     dec.hza[0] += down_hz
                     dec.hza[1] += down_hz
                     if do_subtract == 3 and pass_+1 < npasses:
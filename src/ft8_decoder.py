@@ -7,12 +7,17 @@
 """
 
 import os
+import sys
 import subprocess
 import logging
 import datetime
 import re
 import time
-from typing import List, Dict, Any, Optional, Tuple
+import queue
+import selectors
+import threading
+from collections import deque
+from typing import List, Dict, Optional, Callable, NamedTuple
 
 # 配置日志
 logging.basicConfig(
@@ -21,14 +26,67 @@
 )
 logger = logging.getLogger('FT8Decoder')
 
+class Msg(NamedTuple):
+    """一条解码消息
+    
+    长时间运行时会保存大量消息，使用NamedTuple代替字典以减少内存占用。
+    """
+    time: str  # 解码时间
+    pass_: str  # 解码轮次，如P0
+    time_offset: str  # 时间偏移
+    freq: str  # 频率
+    snr: str  # 信噪比
+    message: str  # 消息内容
+    raw: str  # 解码器输出的原始行
+    
+    def to_dict(self) -> Dict[str, str]:
+        """转换为字典，字段名与JSON导出格式一致
+        
+        Returns:
+            消息字典
+        """
+        return {
+            "time": self.time,
+            "pass": self.pass_,
+            "time_offset": self.time_offset,
+            "freq": self.freq,
+            "snr": self.snr,
+            "message": self.message,
+            "raw": self.raw
+        }
+
+class _AsyncWorker:
+    """一个异步解码常驻进程，以及它正在解码的请求"""
+    
+    def __init__(self, process: subprocess.Popen):
+        """初始化
+        
+        Args:
+            process: 常驻解码进程
+        """
+        self.process = process
+        self.request = None  # (wav_file, callback, 提交时间)，空闲时为None
+        self.partial = b""  # 尚未读到换行的输出
+        self.block = []  # 当前文件已读到的输出行
+        
 class FT8Decoder:
     """FT8解码器类"""
     
-    def __init__(self, decoder_path: str = None):
+    # 解码行格式如: P0 - 14.0  491.5  6598 0.30 -15 CQ DU1RRE PK04
+    # 依次捕获: 轮次、时间偏移、频率、信噪比、消息内容
+    _LINE_RE = re.compile(r'^(P\d+)\s+\S+\s+(\S+)\s+(\S+)\s+\S+\s+\S+\s+(\S+)\s+(.+)$')
+    
+    # 常驻解码进程脚本，每个文件的输出以SENTINEL行结尾
+    _WORKER_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "ft8_worker.py")
+    _SENTINEL = "---END---"
+    
+    def __init__(self, decoder_path: str = None, persistent: bool = True, max_async: int = 1):
         """初始化FT8解码器
         
         Args:
             decoder_path: FT8解码器路径，默认在环境变量中查找
+            persistent: 是否使用常驻解码进程，避免每个文件都重新启动解释器
+            max_async: 异步解码最多同时运行的常驻进程数，也是排队请求数的上限
         """
         self.decoder_path = decoder_path
         if not self.decoder_path:
@@ -39,6 +97,26 @@ def __init__(self, decoder_path: str = None):
         if not self._validate_decoder():
             raise ValueError(f"无法找到有效的FT8解码器: {self.decoder_path}")
             
+        # 空闲的常驻解码进程，并行解码时按需增加
+        self.persistent = persistent
+        self._workers = queue.LifoQueue()
+        if self.persistent:
+            try:
+                self._workers.put(self._spawn_worker())
+            except Exception as e:
+                logger.warning(f"启动常驻解码进程失败，改为每个文件单独启动: {e}")
+                self.persistent = False
+                
+        # 异步解码: 最多max_async个专用常驻进程，每个进程一次解码一个文件，
+        # 进程都忙时请求排队，后台线程用selector读取结果
+        self.max_async = max(1, max_async)
+        self._async_lock = threading.Lock()
+        self._async_workers = []  # _AsyncWorker
+        self._async_thread = None
+        self._async_closed = False
+        self._selector = selectors.DefaultSelector()
+        self._pending = deque()  # 等待空闲进程的请求 (wav_file, callback, 提交时间)
+            
         logger.info(f"FT8解码器初始化完成，使用: {self.decoder_path}")
     
     def _find_decoder(self) -> str:
@@ -83,11 +161,10 @@ def _validate_decoder(self) -> bool:
             
         # 尝试运行一下解码器，看是否正常
         try:
-            ref_dir = os.path.dirname(self.decoder_path)
-            cmd = f"cd {ref_dir} && python3 {os.path.basename(self.decoder_path)} -h"
+            args = [sys.executable, os.path.basename(self.decoder_path), "-h"]
             process = subprocess.Popen(
-                cmd, 
-                shell=True, 
+                args,
+                cwd=os.path.dirname(self.decoder_path),
                 stdout=subprocess.PIPE, 
                 stderr=subprocess.PIPE,
                 text=True
@@ -109,7 +186,7 @@ def _validate_decoder(self) -> bool:
             logger.error(f"验证解码器出错: {e}")
             return False
     
-    def decode_file(self, wav_file: str) -> List[Dict[str, Any]]:
+    def decode_file(self, wav_file: str) -> List[Msg]:
         """解码WAV文件
         
         Args:
@@ -125,81 +202,355 @@ def decode_file(self, wav_file: str) -> List[Dict[str, Any]]:
         decode_start = time.time()
         logger.info(f"开始解码: {wav_file}")
         
-        # 构建解码命令
-        ref_dir = os.path.dirname(self.decoder_path)
-        cmd = f"cd {ref_dir} && python3 {os.path.basename(self.decoder_path)} -file {wav_file}"
+        output = self._decode_persistent(wav_file) if self.persistent else None
+        if output is None:
+            output = self._decode_once(wav_file)
+        if output is None:
+            return []
+            
+        messages = self._parse_messages(output)
+                
+        decode_time = time.time() - decode_start
+        logger.info(f"解码完成，找到 {len(messages)} 条消息，耗时 {decode_time:.2f}秒")
+        
+        return messages
+        
+    def decode_file_async(self, wav_file: str, callback: Callable[[Optional[List[Msg]]], None]) -> None:
+        """提交WAV文件异步解码，立即返回
+        
+        最多max_async个常驻进程并行解码，进程都忙时请求排队；队列已满时丢弃
+        最早的请求，解码跟不上录制时积压不会无限增长。
+        每个请求都恰好回调一次callback: 解码完成时参数为解码结果列表，
+        请求被丢弃或因close()放弃时为None，调用方可据此控制提交速度。
+        回调在后台线程中执行。未使用常驻解码进程时同步解码后直接回调。
+        
+        Args:
+            wav_file: WAV文件路径
+            callback: 解码结束的回调
+        """
+        if not self.persistent:
+            callback(self.decode_file(wav_file))
+            return
+            
+        dropped = None
+        with self._async_lock:
+            if self._async_closed:
+                fallback = [(wav_file, callback, time.time())]
+            else:
+                if len(self._pending) >= self.max_async:
+                    dropped = self._pending.popleft()
+                self._pending.append((wav_file, callback, time.time()))
+                fallback = self._dispatch()
+                
+        if dropped:
+            logger.warning(f"解码跟不上，丢弃排队的请求: {dropped[0]}")
+            self._run_callback(dropped[1], None)
+        self._decode_fallback(fallback)
+        
+    def _dispatch(self) -> List[tuple]:
+        """把排队的请求交给空闲的异步解码进程，进程不足时按需启动，调用方需持有_async_lock
+        
+        Returns:
+            无法启动任何解码进程时取出的请求，由调用方在锁外同步解码
+        """
+        while self._pending:
+            worker = next((w for w in self._async_workers if w.request is None), None)
+            if worker is None:
+                if len(self._async_workers) >= self.max_async:
+                    break
+                try:
+                    worker = self._spawn_async_worker()
+                except Exception as e:
+                    logger.error(f"启动异步解码进程失败: {e}")
+                    if self._async_workers:
+                        # 等待已有进程空闲
+                        break
+                    fallback = list(self._pending)
+                    self._pending.clear()
+                    return fallback
+                    
+            worker.request = self._pending.popleft()
+            wav_file = worker.request[0]
+            logger.info(f"提交异步解码: {wav_file}")
+            try:
+                worker.process.stdin.write(os.path.abspath(wav_file) + "\n")
+                worker.process.stdin.flush()
+            except Exception as e:
+                # 进程已退出，读取线程收到EOF后会改用同步解码处理该请求
+                logger.error(f"提交异步解码失败: {e}")
+        return []
+        
+    def _spawn_async_worker(self) -> _AsyncWorker:
+        """启动一个异步解码进程并交给读取线程，调用方需持有_async_lock
+        
+        Returns:
+            异步解码进程
+        """
+        worker = _AsyncWorker(self._spawn_worker())
+        # 非阻塞读取，结果由selector线程按块取出
+        os.set_blocking(worker.process.stdout.fileno(), False)
+        self._selector.register(worker.process.stdout.fileno(), selectors.EVENT_READ, worker)
+        self._async_workers.append(worker)
+        if self._async_thread is None:
+            self._async_thread = threading.Thread(target=self._async_loop, daemon=True)
+            self._async_thread.start()
+        return worker
+        
+    def _async_loop(self) -> None:
+        """异步解码读取线程，按结束标记切分每个进程的输出
+        
+        所有异步解码进程都退出后结束，之后再提交请求时重新启动。
+        """
+        sentinel = self._SENTINEL.encode()
+        
+        while True:
+            with self._async_lock:
+                if not self._async_workers:
+                    self._async_thread = None
+                    return
+                    
+            # 进程退出时管道读到EOF，无需超时轮询
+            for key, _ in self._selector.select():
+                worker = key.data
+                try:
+                    data = os.read(key.fd, 1 << 16)
+                except BlockingIOError:
+                    continue
+                    
+                if not data:
+                    self._async_worker_exited(worker)
+                    continue
+                    
+                *lines, worker.partial = (worker.partial + data).split(b"\n")
+                for line in lines:
+                    if line != sentinel:
+                        worker.block.append(line)
+                        continue
+                    output = b"\n".join(worker.block).decode(errors="replace")
+                    worker.block = []
+                    with self._async_lock:
+                        request, worker.request = worker.request, None
+                        fallback = [] if self._async_closed else self._dispatch()
+                    if request is not None:
+                        wav_file, callback, submitted = request
+                        messages = self._parse_messages(output)
+                        logger.info(f"异步解码完成: {wav_file}，找到 {len(messages)} 条消息，耗时 {time.time() - submitted:.2f}秒")
+                        self._run_callback(callback, messages)
+                    self._decode_fallback(fallback)
+                    
+    def _async_worker_exited(self, worker: _AsyncWorker) -> None:
+        """异步解码进程已退出，正在解码的请求改用同步解码
+        
+        Args:
+            worker: 已退出的解码进程
+        """
+        with self._async_lock:
+            self._selector.unregister(worker.process.stdout.fileno())
+            self._async_workers.remove(worker)
+            request, worker.request = worker.request, None
+            closed = self._async_closed
+            # 排队的请求交给其他进程，必要时启动新进程
+            fallback = [] if closed else self._dispatch()
+        self._stop_worker(worker.process)
+        worker.process.stdout.close()
+        
+        if request is not None:
+            wav_file, callback, _ = request
+            if closed:
+                self._run_callback(callback, None)
+            else:
+                logger.error(f"异步解码进程已退出，返回码: {worker.process.returncode}，改为同步解码: {wav_file}")
+                self._run_callback(callback, self.decode_file(wav_file))
+        self._decode_fallback(fallback)
+        
+    def _decode_fallback(self, requests: List[tuple]) -> None:
+        """无法使用异步解码进程时，在当前线程中逐个同步解码
+        
+        Args:
+            requests: 请求列表 (wav_file, callback, 提交时间)
+        """
+        for wav_file, callback, _ in requests:
+            self._run_callback(callback, self.decode_file(wav_file))
+            
+    def _run_callback(self, callback: Callable[[Optional[List[Msg]]], None], messages: Optional[List[Msg]]) -> None:
+        """调用解码结束回调，回调出错不影响读取线程
+        
+        Args:
+            callback: 回调函数
+            messages: 解码结果列表，请求被放弃时为None
+        """
+        try:
+            callback(messages)
+        except Exception as e:
+            logger.error(f"解码回调出错: {e}")
+            
+    def _parse_messages(self, output: str) -> List[Msg]:
+        """解析解码器的全部输出
+        
+        Args:
+            output: 解码器输出
+            
+        Returns:
+            解码结果列表
+        """
+        # 同一批输出共用一个解码时间，不匹配的行直接跳过
+        now = datetime.datetime.now().strftime("%H:%M:%S")
+        messages = []
+        for line in output.splitlines():
+            message = self._parse_output(line, now)
+            if message:
+                messages.append(message)
+                logger.info(f"解码消息: {message.pass_} {message.snr:>3} {message.freq:>7} {message.message}")
+        return messages
+        
+    def _spawn_worker(self) -> subprocess.Popen:
+        """启动一个常驻解码进程
+        
+        Returns:
+            解码进程
+        """
+        return subprocess.Popen(
+            [sys.executable, self._WORKER_SCRIPT, self.decoder_path],
+            cwd=os.path.dirname(self.decoder_path),
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            text=True,
+            bufsize=1
+        )
+        
+    def _decode_persistent(self, wav_file: str) -> Optional[str]:
+        """通过常驻解码进程解码
+        
+        Args:
+            wav_file: WAV文件路径
+            
+        Returns:
+            解码器输出，进程异常时返回None
+        """
+        try:
+            worker = self._workers.get_nowait()
+        except queue.Empty:
+            try:
+                worker = self._spawn_worker()
+            except Exception as e:
+                logger.error(f"启动常驻解码进程失败: {e}")
+                return None
+                
+        try:
+            worker.stdin.write(os.path.abspath(wav_file) + "\n")
+            worker.stdin.flush()
+            
+            lines = []
+            for line in worker.stdout:
+                if line.rstrip("\n") == self._SENTINEL:
+                    break
+                lines.append(line)
+            else:
+                raise EOFError(f"解码进程已退出，返回码: {worker.poll()}")
+        except Exception as e:
+            logger.error(f"常驻解码进程出错: {e}")
+            self._stop_worker(worker)
+            return None
+            
+        self._workers.put(worker)
+        return "".join(lines)
+        
+    def _stop_worker(self, worker: subprocess.Popen) -> None:
+        """结束一个常驻解码进程
+        
+        Args:
+            worker: 解码进程
+        """
+        try:
+            worker.stdin.close()
+            worker.wait(timeout=2)
+        except Exception:
+            worker.kill()
+            
+    def close(self) -> None:
+        """结束所有空闲的常驻解码进程和异步解码进程
+        
+        排队的异步请求以None回调放弃；正在解码的文件最多等待2秒，
+        结果仍正常回调，进程被结束时以None回调。
+        """
+        with self._async_lock:
+            self._async_closed = True
+            pending = list(self._pending)
+            self._pending.clear()
+            workers = list(self._async_workers)
+        if pending:
+            logger.warning(f"放弃 {len(pending)} 个排队的异步解码请求")
+        for _, callback, _ in pending:
+            self._run_callback(callback, None)
+            
+        # 进程退出后由读取线程收尾
+        for worker in workers:
+            self._stop_worker(worker.process)
+        thread = self._async_thread
+        if thread is not None:
+            thread.join(timeout=2)
+            
+        while True:
+            try:
+                self._stop_worker(self._workers.get_nowait())
+            except queue.Empty:
+                break
+                
+    def _decode_once(self, wav_file: str) -> Optional[str]:
+        """启动一次解码器进程解码单个文件
+        
+        Args:
+            wav_file: WAV文件路径
+            
+        Returns:
+            解码器输出，出错时返回None
+        """
+        # 构建解码命令，直接执行解释器，不经过shell
+        args = [sys.executable, os.path.basename(self.decoder_path), "-file", os.path.abspath(wav_file)]
         
         try:
-            # 使用Popen运行解码命令并实时获取输出
+            # 运行解码命令，一次性读取全部输出
             process = subprocess.Popen(
-                cmd, 
-                shell=True, 
+                args,
+                cwd=os.path.dirname(self.decoder_path),
                 stdout=subprocess.PIPE, 
                 stderr=subprocess.PIPE,
-                text=True
+                text=True,
+                bufsize=1 << 16
             )
-            
-            # 解析解码结果
-            messages = []
-            for line in iter(process.stdout.readline, ''):
-                if line.startswith('P'):
-                    logger.debug(f"解码行: {line.strip()}")
-                    message = self._parse_output(line.strip())
-                    if message:
-                        messages.append(message)
-                        logger.info(f"解码消息: {message['pass']} {message['snr']:>3} {message['freq']:>7} {message['message']}")
-            
-            # 等待进程完成
-            process.wait()
+            stdout, stderr = process.communicate()
             
             # 检查是否有错误
-            stderr = process.stderr.read()
             if stderr and process.returncode != 0:
                 logger.error(f"解码过程出错: {stderr}")
-            
-            decode_time = time.time() - decode_start
-            logger.info(f"解码完成，找到 {len(messages)} 条消息，耗时 {decode_time:.2f}秒")
-            
-            return messages
+                
+            return stdout
             
         except Exception as e:
             logger.error(f"解码过程中出错: {e}")
-            return []
+            return None
     
-    def _parse_output(self, line: str) -> Optional[Dict[str, Any]]:
+    def _parse_output(self, line: str, now: str = None) -> Optional[Msg]:
         """解析解码器输出
         
         Args:
             line: 一行解码输出
+            now: 解码时间，格式为%H:%M:%S，默认取当前时间
             
         Returns:
-            解析后的消息字典
+            解析后的消息
         """
-        if not line:
+        m = self._LINE_RE.match(line)
+        if not m:
             return None
             
-        try:
-            # 解析格式如: P0 - 14.0  491.5  6598 0.30 -15 CQ DU1RRE PK04
-            parts = line.split()
-            if len(parts) >= 8:
-                pass_num = parts[0]  # P0, P1, ...
-                time_offset = parts[2]  # 时间偏移
-                freq = parts[3]  # 频率
-                snr = parts[6]  # 信噪比
-                message = " ".join(parts[7:])  # 消息内容
-                
-                return {
-                    "time": datetime.datetime.now().strftime("%H:%M:%S"),
-                    "pass": pass_num,
-                    "time_offset": time_offset,
-                    "freq": freq,
-                    "snr": snr,
-                    "message": message,
-                    "raw": line
-                }
-            else:
-                logger.warning(f"无法解析行: {line}")
-                return None
-        except Exception as e:
-            logger.error(f"解析解码器输出出错: {e}, 行: {line}")
-            return None 
\ No newline at end of file
+        pass_num, time_offset, freq, snr, message = m.groups()
+        return Msg(
+            time=now or datetime.datetime.now().strftime("%H:%M:%S"),
+            pass_=pass_num,
+            time_offset=time_offset,
+            freq=freq,
+            snr=snr,
+            message=message.rstrip(),
+            raw=line.strip()
+        )
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+FT8解码常驻进程
+
+启动时导入一次ft8.py，之后从标准输入逐行读取WAV文件路径，直接调用
+FT8.gowav()解码，把得到的消息按ft8.py -file的输出格式写出，
+每个文件的结果以结束标记行结尾。
+
+用法: python3 ft8_worker.py /path/to/ft8.py
+"""
+
+import os
+import sys
+import importlib.util
+
+# 每个文件解码输出的结束标记
+SENTINEL = "---END---"
+
+def load_decoder(script: str):
+    """导入ft8.py，模块级代码只执行一次
+
+    Args:
+        script: ft8.py的绝对路径
+
+    Returns:
+        ft8模块
+    """
+    name = os.path.splitext(os.path.basename(script))[0]
+    spec = importlib.util.spec_from_file_location(name, script)
+    module = importlib.util.module_from_spec(spec)
+    # 解码子进程通过管道回传的Decode对象按模块名反序列化
+    sys.modules[name] = module
+    spec.loader.exec_module(module)
+    return module
+
+def decode(ft8, wav_file: str) -> list:
+    """解码一个WAV文件
+
+    与ft8.py -file的流程相同，但直接取回解码结果，不解析标准输出。
+
+    Args:
+        ft8: ft8模块
+        wav_file: WAV文件路径
+
+    Returns:
+        与ft8.py -file输出格式相同的结果行
+    """
+    # 单个文件无需预热，与-file一样直接fork子进程解码
+    ft8.very_first_time = False
+    ft8.set_start_adj(wav_file)
+    r = ft8.FT8()
+    r.verbose = False
+    r.gowav(wav_file, 0)
+    return ["P%d %s %4.1f %6.1f %5d %.2f %.0f %s" % (dec.pass_,
+                                                     r.band,
+                                                     r.second(dec.decode_time),
+                                                     dec.hz(),
+                                                     dec.start,
+                                                     dec.dt,
+                                                     dec.snr,
+                                                     dec.msg)
+            for dec in r.get_msgs()]
+
+def main():
+    """主函数"""
+    script = os.path.abspath(sys.argv[1])
+    ref_dir = os.path.dirname(script)
+
+    # 结果只写入原标准输出的副本；fd 1改为指向标准错误，ft8.py、它fork出的
+    # 子进程以及C扩展打印的内容都不会混入某个文件的结果
+    sys.stdout.flush()
+    out = os.fdopen(os.dup(sys.stdout.fileno()), "w")
+    os.dup2(sys.stderr.fileno(), sys.stdout.fileno())
+
+    # 与直接运行ft8.py时的工作目录和模块搜索路径保持一致
+    os.chdir(ref_dir)
+    sys.path.insert(0, ref_dir)
+    ft8 = load_decoder(script)
+
+    for line in sys.stdin:
+        wav_file = line.strip()
+        if not wav_file:
+            continue
+
+        lines = []
+        try:
+            lines = decode(ft8, wav_file)
+        except SystemExit:
+            # ft8.py遇到无法处理的WAV格式时调用sys.exit()
+            print(f"解码 {wav_file} 失败", file=sys.stderr)
+        except Exception as e:
+            print(f"解码 {wav_file} 出错: {e}", file=sys.stderr)
+
+        lines.append(SENTINEL)
+        out.write("\n".join(lines) + "\n")
+        out.flush()
+
+if __name__ == "__main__":
+    main()
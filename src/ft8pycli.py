@@ -13,21 +13,45 @@
 import threading
 import queue
 import signal
-import argparse
+import types
 import datetime
 import json
 import concurrent.futures
-from typing import Dict, Any, List, Optional
+import itertools
+from collections import deque
+import multiprocessing
+import multiprocessing.util
+from typing import Dict, Any, List, Optional, Callable, TYPE_CHECKING
 import readline
 import tempfile
+import contextlib
+import importlib.util
+
+# orjson为可选依赖，用于快速导出JSON消息，不可用时使用标准库json
+have_orjson = False
+try:
+    import orjson
+    have_orjson = True
+except ImportError:
+    pass
+
+# prompt_toolkit为可选依赖，后台线程输出时不会打乱正在输入的命令行
+# 导入较慢，这里只检查是否安装，进入交互模式时才导入
+have_prompt_toolkit = importlib.util.find_spec("prompt_toolkit") is not None
 
 # 添加当前目录到模块搜索路径
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
 # 导入自定义模块
-from ft8_decoder import FT8Decoder
-from audio_recorder import AudioRecorder
-from audio_processor import AudioProcessor
+# audio_recorder/audio_processor会导入numpy、scipy和pyaudio，耗时约1秒，
+# 在创建FT8PYCLI或批量解码工作进程时才导入，--help/--version等无需等待
+from ft8_decoder import FT8Decoder, Msg
+from decode_cache import DecodeCache
+if TYPE_CHECKING:
+    from audio_processor import AudioProcessor
+
+# 确保日志目录存在，FileHandler创建时就会打开日志文件
+os.makedirs(os.path.join(os.path.dirname(os.path.abspath(__file__)), "../logs"), exist_ok=True)
 
 # 配置日志
 logging.basicConfig(
@@ -40,9 +64,6 @@
 )
 logger = logging.getLogger('FT8PYCLI')
 
-# 确保日志目录存在
-os.makedirs(os.path.join(os.path.dirname(os.path.abspath(__file__)), "../logs"), exist_ok=True)
-
 # 默认配置
 DEFAULT_CONFIG = {
     "decoder_path": None,  # 自动查找
@@ -56,8 +77,171 @@
     "max_workers": 3,  # 最大工作线程数
     "save_recordings": False,  # 是否保存录音文件
     "save_decoded": True,  # 是否保存解码结果
+    "io_prefetch": True,  # 批量解码时提前让内核预读即将提交的文件
+    "max_messages": 10000,  # 内存中保留的最大消息数，超出时丢弃最旧的消息
+    "decode_cache": True,  # 批量解码时按文件内容缓存解码结果，跳过未变化的文件
 }
 
+# 交互模式的命令提示符
+PROMPT = "FT8PYCLI> "
+
+# 消息输出格式，预先绑定str.format，按Msg字段位置取值: _FMT(*msg)
+# 字段顺序: 0 time, 1 pass_, 2 time_offset, 3 freq, 4 snr, 5 message
+_FMT_DECODED = "  {1} {4:>3} {3:>7} {5}".format
+_FMT_INFO = "  [{0}] {1} {4:>3} {3:>7} {5}".format
+_FMT_TEXT = "[{0}] {1} {4} {3} {5}\n".format
+_FMT_SAVED = "{1} {4} {3} {5}".format
+
+# 批量解码子进程中复用的解码器和音频处理器，每个进程首次调用时创建
+_WORKER_DECODER = None
+_WORKER_PROCESSOR = None
+
+def _iter_wavs(root: str):
+    """递归遍历目录中的WAV文件
+    
+    基于os.scandir的生成器，边遍历边产出路径，不预先构建完整的文件列表。
+    与os.walk一样不进入符号链接指向的目录，并跳过无法读取的目录。
+    
+    Args:
+        root: 目录路径
+        
+    Yields:
+        WAV文件路径
+    """
+    try:
+        with os.scandir(root) as it:
+            for entry in it:
+                if entry.is_dir(follow_symlinks=False):
+                    yield from _iter_wavs(entry.path)
+                elif entry.name.lower().endswith('.wav'):
+                    yield entry.path
+    except OSError as e:
+        logger.warning(f"无法读取目录: {root}, 错误: {e}")
+
+def _readahead(path: str) -> None:
+    """请求内核异步预读整个文件，不等待读取完成
+    
+    Args:
+        path: 文件路径
+    """
+    try:
+        fd = os.open(path, os.O_RDONLY)
+        try:
+            os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_WILLNEED)
+        finally:
+            os.close(fd)
+    except (OSError, AttributeError):
+        # 文件不可读或平台不支持posix_fadvise
+        pass
+
+def _writev_all(fd: int, chunks: List[bytes]) -> None:
+    """将多个字节串写入文件，通常只需一次writev系统调用
+    
+    Args:
+        fd: 文件描述符
+        chunks: 字节串列表
+    """
+    while chunks:
+        if hasattr(os, "writev"):
+            # 单次writev的缓冲区个数受IOV_MAX限制(Linux为1024)
+            written = os.writev(fd, chunks[:1024])
+        else:
+            written = os.write(fd, b"".join(chunks))
+            
+        # 跳过已写出的部分，部分写入时继续写剩余内容
+        done = 0
+        while done < len(chunks) and written >= len(chunks[done]):
+            written -= len(chunks[done])
+            done += 1
+        chunks = chunks[done:]
+        if chunks and written:
+            chunks[0] = chunks[0][written:]
+
+def _decode_one(decoder: FT8Decoder, audio_processor: "AudioProcessor", file_path: str,
+                target_sample_rate: int) -> Optional[Dict[str, Any]]:
+    """按需重采样后解码单个WAV文件
+    
+    Args:
+        decoder: FT8解码器
+        audio_processor: 音频处理器
+        file_path: WAV文件路径
+        target_sample_rate: 解码采样率
+        
+    Returns:
+        解码结果
+    """
+    try:
+        # 采样率已匹配时resample_file直接返回原文件
+        resampled_file = audio_processor.resample_file(file_path, target_rate=target_sample_rate)
+        if not resampled_file:
+            logger.error(f"重采样失败: {file_path}")
+            return None
+        file_path = resampled_file
+            
+        # 解码文件
+        logger.debug(f"解码文件: {file_path}")
+        start_time = time.time()
+        messages = decoder.decode_file(file_path)
+        decode_time = time.time() - start_time
+        
+        return {
+            "file": file_path,
+            "messages": messages,
+            "decode_time": decode_time
+        }
+    except Exception as e:
+        logger.error(f"解码文件出错: {file_path}, 错误: {e}")
+        return None
+
+def _decode_file_worker_mp(file_path: str, target_sample_rate: int, temp_dir: str,
+                           decoder_path: str) -> Optional[Dict[str, Any]]:
+    """批量解码的子进程工作函数
+    
+    FT8Decoder持有子进程和锁，无法传给其他进程，因此每个工作进程首次调用时
+    自己创建解码器和音频处理器，之后的文件复用，进程退出时清理。
+    
+    Args:
+        file_path: WAV文件路径
+        target_sample_rate: 解码采样率
+        temp_dir: 临时文件目录
+        decoder_path: FT8解码器路径
+        
+    Returns:
+        解码结果
+    """
+    global _WORKER_DECODER, _WORKER_PROCESSOR
+    if _WORKER_DECODER is None:
+        try:
+            _WORKER_DECODER = FT8Decoder(decoder_path)
+        except Exception as e:
+            logger.error(f"工作进程初始化解码器失败: {e}")
+            return None
+        from audio_processor import AudioProcessor
+        _WORKER_PROCESSOR = AudioProcessor({
+            "temp_dir": temp_dir,
+            "target_sample_rate": target_sample_rate,
+        })
+        # 工作进程正常退出时执行，结束常驻解码进程并删除临时文件
+        multiprocessing.util.Finalize(_WORKER_DECODER, _WORKER_DECODER.close, exitpriority=10)
+        multiprocessing.util.Finalize(_WORKER_PROCESSOR, _WORKER_PROCESSOR.clear_cache, exitpriority=10)
+        
+    return _decode_one(_WORKER_DECODER, _WORKER_PROCESSOR, file_path, target_sample_rate)
+
+def _decode_chunk_mp(file_paths: List[str], target_sample_rate: int, temp_dir: str,
+                     decoder_path: str) -> List[Optional[Dict[str, Any]]]:
+    """在子进程中依次解码一批文件，减少进程间通信次数
+    
+    Args:
+        file_paths: WAV文件路径列表
+        target_sample_rate: 解码采样率
+        temp_dir: 临时文件目录
+        decoder_path: FT8解码器路径
+        
+    Returns:
+        解码结果列表
+    """
+    return [_decode_file_worker_mp(path, target_sample_rate, temp_dir, decoder_path) for path in file_paths]
+
 class FT8PYCLI:
     """FT8PYCLI主类"""
     
@@ -79,9 +263,13 @@ def __init__(self, config: Dict[str, Any] = None):
             "buffer_size": 4,  # 缓冲区大小
             "advance_seconds": 0.5,  # 提前开始录制的秒数
             "target_sample_rate": 12000,  # 目标采样率，FT8解码通常需要12kHz
+            "use_fast_resample": False,  # 是否使用快速Hermite重采样(需要numba)
+            "use_fft_resample": False,  # 是否使用多线程FFT重采样
             "auto_start": False,  # 是否自动开始实时解码
             "auto_device": None,  # 自动选择的设备ID
             "record_seconds": 13.5,  # 录音时长
+            "io_prefetch": True,  # 批量解码时预读文件
+            "decode_cache": True,  # 批量解码时缓存解码结果
         }
         
         # 更新配置
@@ -94,21 +282,42 @@ def __init__(self, config: Dict[str, Any] = None):
             
         # 确保必要的目录存在
         os.makedirs(self.config["output_dir"], exist_ok=True)
-        os.makedirs(os.path.join(self.config["output_dir"], "decoded"), exist_ok=True)
+        # 解码结果目录只在启动时创建，每次保存不再调用makedirs
+        self._decoded_dir = os.path.join(self.config["output_dir"], "decoded")
+        os.makedirs(self._decoded_dir, exist_ok=True)
         os.makedirs(self.config["temp_dir"], exist_ok=True)
 
         # 设置日志级别
         logging.getLogger().setLevel(getattr(logging, self.config["log_level"]))
 
+        # 较重的音频模块在此导入，见模块开头的说明
+        from audio_recorder import AudioRecorder
+        from audio_processor import AudioProcessor
+        
         # 初始化FT8解码器
         self.decoder = FT8Decoder()
         
+        # 批量解码结果缓存，解码器脚本或目标采样率变化后旧结果失效
+        self.decode_cache = None
+        if self.config["decode_cache"]:
+            try:
+                decoder_mtime = os.path.getmtime(self.decoder.decoder_path)
+            except OSError:
+                decoder_mtime = 0
+            self.decode_cache = DecodeCache(
+                os.path.join(self.config["temp_dir"], "decode_cache.sqlite"),
+                signature=f"{self.decoder.decoder_path}:{decoder_mtime}:{self.config['target_sample_rate']}")
+        
         # 初始化音频处理器，用于重采样
         self.audio_processor = AudioProcessor({
             "temp_dir": self.config["temp_dir"],
             "target_sample_rate": self.config["target_sample_rate"],
             "cache_size": 20,  # 适当增加缓存大小
+            "use_fast_resample": self.config["use_fast_resample"],
+            "use_fft_resample": self.config["use_fft_resample"],
         })
+        # 预先设计常见声卡采样率的重采样滤波器，首个实时周期无需等待
+        self.audio_processor.prewarm()
         
         # 初始化音频录制器
         self.recorder = AudioRecorder({
@@ -116,17 +325,40 @@ def __init__(self, config: Dict[str, Any] = None):
             "buffer_size": self.config["buffer_size"],
             "advance_seconds": self.config["advance_seconds"],
             "record_seconds": self.config["record_seconds"],
+            "output_sample_rate": self.config["target_sample_rate"],
+            # 保存录音时在录制过程中写入原始音频
+            "spool_recordings": self.config["save_recordings"],
+            "temp_dir": self.config["temp_dir"],
         })
         
         # 初始化线程池
         self.executor = concurrent.futures.ThreadPoolExecutor(max_workers=self.config["max_workers"])
+        # 批量解码的进程池，首次批量解码时创建，之后复用
+        self._proc_executor = None
         
         # 初始化状态变量
         self.running = False
         self.stop_event = threading.Event()
         self.decode_thread = None
-        self.messages = []
-        self.messages_lock = threading.Lock()
+        # 解码线程的并发名额，实时解码运行时才存在；名额归还或停止时设置_slot_freed
+        self._decode_slots = None
+        self._slot_freed = threading.Event()
+        # 有界队列，长时间实时解码时内存不会无限增长
+        # deque的append/extend/clear及整体复制都在C层一次完成，多个线程共用无需加锁
+        self.messages = deque(maxlen=self.config.get("max_messages", 10000))
+        
+        # 单文件解码结果的文件名: 启动时间前缀加递增序号，不必每个文件都格式化时间
+        self._run_prefix = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
+        self._file_counter = itertools.count()
+        
+        # 解码结果文件由单独的线程写入，解码线程不等待磁盘: (文件路径, 文本)
+        self._io_queue = queue.Queue()
+        self._io_thread = threading.Thread(target=self._io_writer_thread, daemon=True)
+        self._io_thread.start()
+        
+        # 交互输入期间后台线程输出需要重绘readline提示符，见_print_async
+        self._redraw_prompt = False
+        self._print_lock = threading.Lock()
         
         # 注册信号处理器
         signal.signal(signal.SIGINT, self._signal_handler)
@@ -152,28 +384,65 @@ def start(self):
         print("\n欢迎使用FT8PYCLI - FT8解码命令行工具!")
         print("输入'help'查看帮助，输入'exit'退出程序\n")
         
+        # 有prompt_toolkit时由patch_stdout处理后台线程的输出，
+        # 否则使用readline输入，后台输出时由_print_async重绘提示符和已输入的内容
+        interactive = sys.stdin.isatty() and sys.stdout.isatty()
+        if have_prompt_toolkit and interactive:
+            from prompt_toolkit import PromptSession
+            from prompt_toolkit.patch_stdout import patch_stdout
+            session = PromptSession()
+            read_command = lambda: session.prompt(PROMPT)
+            stdout_context = patch_stdout()
+        else:
+            read_command = lambda: input(PROMPT)
+            stdout_context = contextlib.nullcontext()
+            self._redraw_prompt = interactive
+            
         # 处理命令行输入
-        while True:
-            try:
-                command = input("FT8PYCLI> ").strip()
-                if not command:
-                    continue
+        with stdout_context:
+            while True:
+                try:
+                    command = read_command().strip()
+                    if not command:
+                        continue
+                        
+                    if command.lower() in ["exit", "quit"]:
+                        break
+                        
+                    self._process_command(command)
                     
-                if command.lower() in ["exit", "quit"]:
+                except KeyboardInterrupt:
+                    print("\n收到Ctrl+C，退出程序")
                     break
+                except EOFError:
+                    # 输入结束(Ctrl+D或管道输入读完)
+                    print()
+                    break
+                except Exception as e:
+                    logger.error(f"处理命令时出错: {e}")
                     
-                self._process_command(command)
-                
-            except KeyboardInterrupt:
-                print("\n收到Ctrl+C，退出程序")
-                break
-            except Exception as e:
-                logger.error(f"处理命令时出错: {e}")
-                
+        self._redraw_prompt = False
+        
         # 退出前停止所有任务
         self.stop()
         logger.info("FT8PYCLI退出")
         
+    def _print_async(self, text: str):
+        """从后台线程输出一行文本
+        
+        使用readline输入时，先清除当前行输出文本，再重绘提示符和用户已输入的内容，
+        避免解码结果插入到正在输入的命令中间。
+        
+        Args:
+            text: 输出的文本
+        """
+        with self._print_lock:
+            if self._redraw_prompt:
+                sys.stdout.write(f"\r\x1b[K{text}\n{PROMPT}{readline.get_line_buffer()}")
+                sys.stdout.flush()
+            else:
+                print(text)
+                
     def stop(self):
         """停止FT8PYCLI
         
@@ -185,6 +454,7 @@ def stop(self):
         # 设置停止事件
         self.stop_event.set()
         self.running = False
+        self._wake_decode_worker()
         
         # 停止录制
         self.recorder.stop()
@@ -273,7 +543,7 @@ def _print_help(self):
         print("  stop                - 停止实时解码")
         print("  info                - 显示当前状态信息")
         print("  clear               - 清空已解码的消息")
-        print("  save <file>         - 保存解码的消息到文件")
+        print("  save <file>         - 保存解码的消息到文件(.json/.jsonl/文本)")
         print("  config              - 显示当前配置")
         print("  config <key> <value>- 设置配置项")
         print("  exit                - 退出程序")
@@ -306,17 +576,14 @@ def _decode_file(self, file_path: str):
             
         print(f"解码: {file_path}")
         
-        # 检查是否需要重采样
-        with wave.open(file_path, 'rb') as wf:
-            sample_rate = wf.getframerate()
-            
-        if sample_rate != self.config["target_sample_rate"]:
-            print(f"重采样从 {sample_rate}Hz 到 {self.config['target_sample_rate']}Hz")
-            resampled_file = self.audio_processor.resample_file(file_path)
-            if not resampled_file:
-                print("重采样失败")
-                return
-            file_path = resampled_file
+        # 采样率已匹配时resample_file直接返回原文件
+        resampled_file = self.audio_processor.resample_file(file_path)
+        if not resampled_file:
+            print("重采样失败")
+            return
+        if resampled_file != file_path:
+            print(f"已重采样到 {self.config['target_sample_rate']}Hz")
+        file_path = resampled_file
             
         # 解码文件
         start_time = time.time()
@@ -326,25 +593,15 @@ def _decode_file(self, file_path: str):
         # 打印解码结果
         if messages:
             print(f"\n找到 {len(messages)} 条消息:")
-            for msg in messages:
-                print(f"  {msg['pass']} {msg['snr']:>3} {msg['freq']:>7} {msg['message']}")
+            # 拼接后一次写出，不必每条消息调用一次print
+            sys.stdout.write("\n".join(_FMT_DECODED(*msg) for msg in messages) + "\n")
             
             # 添加到消息列表
-            with self.messages_lock:
-                self.messages.extend(messages)
+            self.messages.extend(messages)
                 
             # 保存解码结果
             if self.config["save_decoded"]:
-                output_dir = os.path.join(self.config["output_dir"], "decoded")
-                os.makedirs(output_dir, exist_ok=True)
-                
-                timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
-                output_file = os.path.join(output_dir, f"decoded_{timestamp}_{os.path.basename(file_path)}.txt")
-                
-                with open(output_file, 'w') as f:
-                    for msg in messages:
-                        f.write(f"{msg['pass']} {msg['snr']} {msg['freq']} {msg['message']}\n")
-                        
+                output_file = self._save_decoded(messages, f"{self._run_prefix}_{next(self._file_counter):06d}_{os.path.basename(file_path)}")
                 print(f"解码结果已保存到: {output_file}")
         else:
             print("未找到解码消息")
@@ -361,43 +618,57 @@ def _batch_decode(self, directory: str):
             print(f"错误: 目录不存在: {directory}")
             return
             
-        # 查找目录中的WAV文件
-        wav_files = []
-        for root, dirs, files in os.walk(directory):
-            for file in files:
-                if file.lower().endswith('.wav'):
-                    wav_files.append(os.path.join(root, file))
-                    
-        if not wav_files:
+        # 边遍历目录边解码，找到第一个WAV文件即可开始
+        wav_files = _iter_wavs(directory)
+        first = next(wav_files, None)
+        if first is None:
             print(f"目录中没有WAV文件: {directory}")
             return
+        wav_files = itertools.chain([first], wav_files)
             
-        print(f"找到 {len(wav_files)} 个WAV文件，开始批量解码...")
+        print(f"开始批量解码目录: {directory}")
         
         # 使用线程池并行解码
         start_time = time.time()
         results = []
         
         if self.config["parallel_decoding"]:
-            # 并行解码
-            with concurrent.futures.ThreadPoolExecutor(max_workers=self.config["max_workers"]) as executor:
-                futures = []
-                for file_path in wav_files:
-                    future = executor.submit(self._decode_file_worker, file_path)
-                    futures.append(future)
+            # 多进程并行解码，重采样等数值计算不受GIL限制
+            # 每块8个文件，每个工作进程最多两块在途：遍历目录与解码交替进行，
+            # 提交前预读的文件在前面的块解码期间从磁盘读入页缓存
+            max_in_flight = 2 * self.config["max_workers"]
+            in_flight = deque()
+            executor = self._get_proc_executor()
+            while True:
+                chunk = list(itertools.islice(wav_files, 8))
+                exhausted = not chunk
+                # 缓存命中的文件直接加入结果，其余提交给工作进程
+                todo, keys = self._take_cached(chunk, results)
+                if todo:
+                    if self.config["io_prefetch"]:
+                        for file_path in todo:
+                            _readahead(file_path)
+                    in_flight.append((executor.submit(
+                        _decode_chunk_mp, todo, self.config["target_sample_rate"],
+                        self.config["temp_dir"], self.decoder.decoder_path), keys))
+                    
+                # 按提交顺序收集结果
+                while in_flight and (exhausted or len(in_flight) >= max_in_flight):
+                    future, todo_keys = in_flight.popleft()
+                    self._collect(future.result(), todo_keys, results)
                     
-                # 收集结果
-                for future in concurrent.futures.as_completed(futures):
-                    result = future.result()
-                    if result:
-                        results.append(result)
+                if exhausted:
+                    break
         else:
             # 串行解码
             for file_path in wav_files:
-                result = self._decode_file_worker(file_path)
-                if result:
-                    results.append(result)
+                todo, keys = self._take_cached([file_path], results)
+                if todo:
+                    self._collect([self._decode_file_worker(file_path)], keys, results)
                     
+        if self.decode_cache:
+            self.decode_cache.commit()
+            
         total_time = time.time() - start_time
         
         # 合并所有消息
@@ -406,15 +677,67 @@ def _batch_decode(self, directory: str):
             all_messages.extend(result["messages"])
             
         # 添加到消息列表
-        with self.messages_lock:
-            self.messages.extend(all_messages)
+        self.messages.extend(all_messages)
             
         # 汇总结果
         print(f"\n批量解码完成，耗时 {total_time:.2f}秒")
         print(f"解码了 {len(results)} 个文件，找到 {len(all_messages)} 条消息")
         
+    def _take_cached(self, file_paths: List[str], results: List[Dict[str, Any]]):
+        """从解码缓存中取出已解码文件的结果
+        
+        Args:
+            file_paths: WAV文件路径列表
+            results: 命中的结果追加到此列表
+            
+        Returns:
+            (需要解码的文件路径列表, 对应的缓存键列表)
+        """
+        if not self.decode_cache:
+            return file_paths, [None] * len(file_paths)
+            
+        todo, keys = [], []
+        for file_path in file_paths:
+            key = self.decode_cache.file_key(file_path)
+            messages = self.decode_cache.get(key) if key else None
+            if messages is None:
+                todo.append(file_path)
+                keys.append(key)
+            else:
+                results.append({"file": file_path, "messages": messages, "decode_time": 0.0})
+        return todo, keys
+        
+    def _collect(self, chunk_results: List[Optional[Dict[str, Any]]], keys: List[Optional[str]],
+                 results: List[Dict[str, Any]]):
+        """收集解码结果并写入解码缓存
+        
+        Args:
+            chunk_results: 与keys一一对应的解码结果，解码失败为None
+            keys: 缓存键列表
+            results: 成功的结果追加到此列表
+        """
+        for result, key in zip(chunk_results, keys):
+            if result is None:
+                continue
+            results.append(result)
+            if key and self.decode_cache:
+                self.decode_cache.put(key, result["messages"])
+                
+    def _get_proc_executor(self) -> concurrent.futures.ProcessPoolExecutor:
+        """获取批量解码的进程池，多次批量解码复用同一组工作进程
+        
+        Returns:
+            进程池
+        """
+        if self._proc_executor is None:
+            # 使用spawn启动工作进程，避免在录制/解码线程运行时fork
+            self._proc_executor = concurrent.futures.ProcessPoolExecutor(
+                max_workers=self.config["max_workers"],
+                mp_context=multiprocessing.get_context("spawn"))
+        return self._proc_executor
+        
     def _decode_file_worker(self, file_path: str) -> Optional[Dict[str, Any]]:
-        """解码文件工作线程
+        """串行批量解码时解码单个文件
         
         Args:
             file_path: WAV文件路径
@@ -422,33 +745,7 @@ def _decode_file_worker(self, file_path: str) -> Optional[Dict[str, Any]]:
         Returns:
             解码结果
         """
-        try:
-            # 检查是否需要重采样
-            with wave.open(file_path, 'rb') as wf:
-                sample_rate = wf.getframerate()
-                
-            if sample_rate != self.config["target_sample_rate"]:
-                logger.debug(f"重采样文件: {file_path}")
-                resampled_file = self.audio_processor.resample_file(file_path)
-                if not resampled_file:
-                    logger.error(f"重采样失败: {file_path}")
-                    return None
-                file_path = resampled_file
-                
-            # 解码文件
-            logger.debug(f"解码文件: {file_path}")
-            start_time = time.time()
-            messages = self.decoder.decode_file(file_path)
-            decode_time = time.time() - start_time
-            
-            return {
-                "file": file_path,
-                "messages": messages,
-                "decode_time": decode_time
-            }
-        except Exception as e:
-            logger.error(f"解码文件出错: {file_path}, 错误: {e}")
-            return None
+        return _decode_one(self.decoder, self.audio_processor, file_path, self.config["target_sample_rate"])
             
     def _start_live_decode(self, device_id: int):
         """开始实时解码
@@ -474,7 +771,12 @@ def _start_live_decode(self, device_id: int):
         self.stop_event.clear()
         self.running = True
         
-        # 启动解码线程
+        # 并行解码时每个周期由各自的常驻解码进程处理
+        self.decoder.max_async = self.config["max_workers"] if self.config["parallel_decoding"] else 1
+        
+        # 启动解码线程，限制同时处理的周期数
+        self._decode_slots = threading.BoundedSemaphore(
+            self.config["max_workers"] if self.config["parallel_decoding"] else 1)
         self.decode_thread = threading.Thread(target=self._decode_worker_thread)
         self.decode_thread.daemon = True
         self.decode_thread.start()
@@ -490,6 +792,7 @@ def _stop_live_decode(self):
         # 设置停止事件
         self.stop_event.set()
         self.running = False
+        self._wake_decode_worker()
         
         # 停止录制
         self.recorder.stop()
@@ -500,53 +803,85 @@ def _stop_live_decode(self):
             
         print("已停止实时解码")
         
+    def _wake_decode_worker(self):
+        """停止时唤醒等待名额的解码线程，解码线程随后检查停止标志退出"""
+        self._slot_freed.set()
+        
+    def _release_decode_slot(self, slots: threading.BoundedSemaphore):
+        """一个周期解码结束，归还名额并唤醒解码线程
+        
+        Args:
+            slots: 该周期占用的名额所属的信号量
+        """
+        slots.release()
+        self._slot_freed.set()
+        
+    def _acquire_decode_slot(self, slots: threading.BoundedSemaphore) -> bool:
+        """等待空闲名额，不轮询
+        
+        先清除_slot_freed再尝试获取，获取失败后归还的名额一定会设置事件，不会漏掉唤醒。
+        
+        Args:
+            slots: 名额信号量
+            
+        Returns:
+            是否获得名额，停止时返回False
+        """
+        while True:
+            self._slot_freed.clear()
+            if self.stop_event.is_set() or not self.running:
+                return False
+            if slots.acquire(blocking=False):
+                return True
+            self._slot_freed.wait()
+            
     def _decode_worker_thread(self):
         """解码工作线程"""
         logger.info("解码工作线程启动")
         
-        # 使用集合追踪正在处理的任务
-        active_futures = set()
+        # 每个名额对应一个从提交到解码结束的周期，限制同时解码的周期数
+        slots = self._decode_slots
+        release = lambda: self._release_decode_slot(slots)
         
-        while not self.stop_event.is_set() and self.running:
+        while self._acquire_decode_slot(slots):
+            # 名额交给_process_audio_data之前由本线程负责归还
+            held = True
             try:
-                # 清理已完成的任务
-                done_futures = {f for f in active_futures if f.done()}
-                active_futures -= done_futures
-                
-                # 检查是否有容量处理新任务
-                if len(active_futures) >= self.config["max_workers"]:
-                    time.sleep(0.1)
-                    continue
-                    
-                # 从录音器获取音频数据
-                audio_data = self.recorder.get_next_audio(timeout=0.5)
+                # 等待录音器完成一个周期，停止时recorder.stop()会立即唤醒，无需定时轮询
+                audio_data = self.recorder.get_next_audio(timeout=None)
                 if not audio_data:
-                    # 队列为空，继续等待
+                    # 被停止操作唤醒，回到循环开头检查停止标志
                     continue
                     
-                # 提交到线程池中执行
+                # 解码结束(或无法解码)时由_process_audio_data归还名额
                 if self.config["parallel_decoding"]:
-                    future = self.executor.submit(self._process_audio_data, audio_data)
-                    active_futures.add(future)
+                    self.executor.submit(self._process_audio_data, audio_data, release)
+                    held = False
                 else:
                     # 串行处理
-                    self._process_audio_data(audio_data)
+                    held = False
+                    self._process_audio_data(audio_data, release)
                     
             except Exception as e:
                 logger.error(f"解码工作线程出错: {e}")
                 time.sleep(0.5)
-                
+            finally:
+                if held:
+                    release()
+                    
         logger.info("解码工作线程结束")
         
-    def _process_audio_data(self, audio_data: Dict[str, Any]):
+    def _process_audio_data(self, audio_data: Dict[str, Any], on_done: Optional[Callable[[], None]] = None):
         """处理音频数据
         
         Args:
             audio_data: 音频数据
+            on_done: 该周期结束时调用一次: 解码结果处理完毕后，或者未能提交解码时
         """
+        submitted = False
         try:
             # 检查音频数据有效性
-            if not audio_data or not audio_data.get("frames"):
+            if not audio_data or not len(audio_data.get("samples", ())):
                 logger.error("无效的音频数据，跳过处理")
                 return
                 
@@ -557,6 +892,13 @@ def _process_audio_data(self, audio_data: Dict[str, Any]):
             if self.config["save_recordings"]:
                 wav_file = self.recorder.save_audio_file(audio_data, f"recording_{timestamp}.wav")
                 logger.debug(f"保存录音: {wav_file}")
+            elif audio_data.get("wav_file"):
+                # 录制期间关闭了save_recordings，录制时写入的临时文件不再需要
+                try:
+                    os.remove(audio_data["wav_file"])
+                except OSError:
+                    pass
+                audio_data["wav_file"] = None
             
             # 重采样音频数据
             resampled_wav = self.audio_processor.resample_audio_data(audio_data)
@@ -572,46 +914,154 @@ def _process_audio_data(self, audio_data: Dict[str, Any]):
                 # 使用重采样后的文件
                 wav_file = resampled_wav
                 
-            # 确认文件存在
+            # 确认文件存在，缓存的文件被外部删除时重新生成一次
+            if not os.path.exists(wav_file) and self.audio_processor.invalidate_file(wav_file):
+                logger.warning(f"缓存的WAV文件已被删除，重新生成: {wav_file}")
+                wav_file = self.audio_processor.resample_audio_data(audio_data) or wav_file
             if not os.path.exists(wav_file):
                 logger.error(f"WAV文件不存在: {wav_file}")
                 return
                 
-            # 解码WAV文件
+            # 提交异步解码，结果由解码器后台线程回调，不阻塞下一个周期的处理
             cycle_start = audio_data["cycle_start"]
             logger.info(f"开始解码 {cycle_start} 的数据...")
             
             start_time = time.time()
-            messages = self.decoder.decode_file(wav_file)
-            decode_time = time.time() - start_time
             
-            # 打印解码结果
-            if messages:
-                print(f"解码完成，周期 {cycle_start}, 找到 {len(messages)} 条消息")
+            def decoded(messages: Optional[List[Msg]]):
+                try:
+                    self._handle_decoded(audio_data, wav_file, messages, time.time() - start_time)
+                finally:
+                    if on_done is not None:
+                        on_done()
+                        
+            # 解码器保证每个请求恰好回调一次
+            self.decoder.decode_file_async(wav_file, decoded)
+            submitted = True
+            
+        except Exception as e:
+            logger.error(f"处理音频数据出错: {e}")
+        finally:
+            if not submitted and on_done is not None:
+                on_done()
+            
+    def _handle_decoded(self, audio_data: Dict[str, Any], wav_file: str, messages: Optional[List[Msg]],
+                        decode_time: float):
+        """处理一个周期的解码结果
+        
+        Args:
+            audio_data: 音频数据
+            wav_file: 解码的WAV文件
+            messages: 解码结果列表，解码跟不上被丢弃或退出时放弃的周期为None
+            decode_time: 解码耗时，秒
+        """
+        cycle_start = audio_data["cycle_start"]
+        
+        if messages is None:
+            self._print_async(f"解码已跳过，周期 {cycle_start}")
+            return
+            
+        # 打印解码结果
+        if messages:
+            self._print_async(f"解码完成，周期 {cycle_start}, 找到 {len(messages)} 条消息")
+            
+            # 添加到消息列表
+            self.messages.extend(messages)
                 
-                # 添加到消息列表
-                with self.messages_lock:
-                    self.messages.extend(messages)
+            # 保存解码结果
+            if self.config["save_decoded"]:
+                output_file = self._save_decoded(messages, f"{audio_data['timestamp']}_{os.path.basename(wav_file)}")
+                logger.info(f"解码结果已保存到: {output_file}")
+        else:
+            self._print_async(f"解码完成，周期 {cycle_start}, 未找到消息")
+            
+        logger.info(f"解码处理完成，周期 {cycle_start}, 耗时 {decode_time:.2f}秒")
+        
+    def _save_decoded(self, messages: List[Msg], name: str) -> str:
+        """保存解码结果
+        
+        结果文本一次拼接好后交给写入线程，每个文件只有一次write调用。
+        
+        Args:
+            messages: 解码结果列表
+            name: 结果文件名中间部分
+            
+        Returns:
+            str: 结果文件路径
+        """
+        output_file = os.path.join(self._decoded_dir, f"decoded_{name}.txt")
+        payload = "\n".join(_FMT_SAVED(*msg) for msg in messages) + "\n"
+        self._io_queue.put((output_file, payload))
+        return output_file
+        
+    def _io_writer_thread(self):
+        """解码结果写入线程
+        
+        取出队列中已有的全部写入请求，同一文件的内容用一次writev追加写入。
+        收到None时写完剩余内容后退出。
+        """
+        running = True
+        while running:
+            batch = [self._io_queue.get()]
+            while True:
+                try:
+                    batch.append(self._io_queue.get_nowait())
+                except queue.Empty:
+                    break
                     
-                # 保存解码结果
-                if self.config["save_decoded"]:
-                    output_dir = os.path.join(self.config["output_dir"], "decoded")
-                    os.makedirs(output_dir, exist_ok=True)
+            pending = {}
+            for item in batch:
+                if item is None:
+                    running = False
+                else:
+                    pending.setdefault(item[0], []).append(item[1])
                     
-                    output_file = os.path.join(output_dir, f"decoded_{audio_data['timestamp']}_{os.path.basename(wav_file)}.txt")
+            for path, texts in pending.items():
+                try:
+                    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o644)
+                    try:
+                        _writev_all(fd, [text.encode() for text in texts])
+                    finally:
+                        os.close(fd)
+                except Exception as e:
+                    logger.error(f"写入解码结果出错: {path}, 错误: {e}")
                     
-                    with open(output_file, 'w') as f:
-                        for msg in messages:
-                            f.write(f"{msg['pass']} {msg['snr']} {msg['freq']} {msg['message']}\n")
-                            
-                    logger.info(f"解码结果已保存到: {output_file}")
-            else:
-                print(f"解码完成，周期 {cycle_start}, 未找到消息")
-                
-            logger.info(f"解码处理完成，周期 {cycle_start}, 耗时 {decode_time:.2f}秒")
+    def close(self):
+        """退出前释放所有资源
+        
+        停止实时解码，结束常驻解码进程和批量解码进程池，清理重采样临时文件，
+        关闭解码结果缓存，写完排队的解码结果。
+        """
+        self.stop()
+        
+        # 结束常驻解码进程
+        self.decoder.close()
+        
+        # 结束批量解码进程池，工作进程退出时清理各自的临时文件
+        if self._proc_executor is not None:
+            self._proc_executor.shutdown(wait=True)
+            self._proc_executor = None
             
-        except Exception as e:
-            logger.error(f"处理音频数据出错: {e}")
+        # 清理主进程重采样产生的临时文件；未启动实时解码时stop()直接返回，
+        # decode/batch命令留下的文件只能在这里清理
+        self.audio_processor.clear_cache()
+            
+        # 提交并关闭解码结果缓存
+        if self.decode_cache:
+            self.decode_cache.close()
+            
+        # 写完排队的解码结果
+        self.flush_io()
+        
+    def flush_io(self, timeout: float = 5.0):
+        """写完所有排队的解码结果并结束写入线程
+        
+        Args:
+            timeout: 最长等待时间，秒
+        """
+        if self._io_thread.is_alive():
+            self._io_queue.put(None)
+            self._io_thread.join(timeout)
             
     def _show_info(self):
         """显示当前状态信息"""
@@ -619,18 +1069,20 @@ def _show_info(self):
         print(f"  运行状态: {'运行中' if self.running else '已停止'}")
         print(f"  解码消息数: {len(self.messages)}")
         
+        # 解码线程可能同时追加消息，在Python层逐条迭代deque会出错，
+        # 由list()在C层一次取出最后10条
+        recent = list(itertools.islice(reversed(self.messages), 10))[::-1]
+            
         # 显示最近的消息
-        if self.messages:
+        if recent:
             print("\n最近的10条消息:")
-            for msg in self.messages[-10:]:
-                print(f"  [{msg['time']}] {msg['pass']} {msg['snr']:>3} {msg['freq']:>7} {msg['message']}")
+            sys.stdout.write("\n".join(_FMT_INFO(*msg) for msg in recent) + "\n")
             print()
             
     def _clear_messages(self):
         """清空已解码的消息"""
-        with self.messages_lock:
-            count = len(self.messages)
-            self.messages.clear()
+        count = len(self.messages)
+        self.messages.clear()
             
         print(f"已清空 {count} 条消息")
         
@@ -640,23 +1092,34 @@ def _save_messages(self, file_path: str):
         Args:
             file_path: 文件路径
         """
-        if not self.messages:
+        messages = list(self.messages)
+            
+        if not messages:
             print("没有消息可保存")
             return
             
         try:
             # 确定文件类型
-            if file_path.lower().endswith('.json'):
-                # JSON格式
-                with open(file_path, 'w') as f:
-                    json.dump(self.messages, f, indent=2)
+            if file_path.lower().endswith('.jsonl'):
+                # JSON Lines格式，每行一条消息
+                with open(file_path, 'wb') as f:
+                    if have_orjson:
+                        f.writelines(orjson.dumps(msg.to_dict()) + b"\n" for msg in messages)
+                    else:
+                        f.writelines((json.dumps(msg.to_dict(), ensure_ascii=False) + "\n").encode() for msg in messages)
+            elif file_path.lower().endswith('.json'):
+                # JSON格式，orjson直接生成UTF-8字节，一次写入
+                with open(file_path, 'wb') as f:
+                    if have_orjson:
+                        f.write(orjson.dumps([msg.to_dict() for msg in messages], option=orjson.OPT_INDENT_2))
+                    else:
+                        f.write(json.dumps([msg.to_dict() for msg in messages], indent=2).encode())
             else:
                 # 文本格式
                 with open(file_path, 'w') as f:
-                    for msg in self.messages:
-                        f.write(f"[{msg['time']}] {msg['pass']} {msg['snr']} {msg['freq']} {msg['message']}\n")
+                    f.writelines(_FMT_TEXT(*msg) for msg in messages)
                         
-            print(f"已保存 {len(self.messages)} 条消息到: {file_path}")
+            print(f"已保存 {len(messages)} 条消息到: {file_path}")
         except Exception as e:
             print(f"保存消息出错: {e}")
             
@@ -701,6 +1164,11 @@ def _set_config(self, key: str, value: str):
         # 应用特殊配置
         if key == "log_level":
             logging.getLogger().setLevel(getattr(logging, value))
+        elif key == "save_recordings":
+            self.recorder.config["spool_recordings"] = value
+        elif key == "output_dir":
+            self._decoded_dir = os.path.join(value, "decoded")
+            os.makedirs(self._decoded_dir, exist_ok=True)
             
         print(f"已设置 {key} = {value}")
         
@@ -740,16 +1208,72 @@ def save_config(config: Dict[str, Any], config_file: str):
     except Exception as e:
         logger.error(f"保存配置文件出错: {e}")
         
+# 命令行帮助，参数很少，手写解析以免导入argparse和gettext
+_USAGE = "usage: ft8pycli.py [-h] [-c CONFIG] [-f FILE] [-d DEVICE] [-v] [--version]"
+_HELP = _USAGE + """
+
+FT8PYCLI - FT8解码命令行工具
+
+options:
+  -h, --help            show this help message and exit
+  -c, --config CONFIG   配置文件路径
+  -f, --file FILE       解码指定的WAV文件
+  -d, --device DEVICE   指定音频设备ID进行实时解码
+  -v, --verbose         详细日志输出
+  --version             show program's version number and exit
+"""
+_VERSION = "FT8PYCLI v1.0.0"
+
+def parse_args(argv: List[str]):
+    """解析命令行参数
+    
+    支持"-c 值"、"--config 值"和"--config=值"三种写法，出错时与argparse一样
+    输出用法并以状态码2退出。
+    
+    Args:
+        argv: 命令行参数，不含程序名
+        
+    Returns:
+        包含config、file、device、verbose属性的参数对象
+    """
+    options = {"-c": "config", "--config": "config",
+               "-f": "file", "--file": "file",
+               "-d": "device", "--device": "device"}
+    args = {"config": None, "file": None, "device": None, "verbose": False}
+    
+    def error(message: str):
+        sys.stderr.write(f"{_USAGE}\nft8pycli.py: error: {message}\n")
+        sys.exit(2)
+        
+    i = 0
+    while i < len(argv):
+        arg = argv[i]
+        i += 1
+        if arg in ("-h", "--help"):
+            sys.stdout.write(_HELP)
+            sys.exit(0)
+        elif arg == "--version":
+            print(_VERSION)
+            sys.exit(0)
+        elif arg in ("-v", "--verbose"):
+            args["verbose"] = True
+            continue
+            
+        name, sep, value = arg.partition("=")
+        if name not in options or (sep and not name.startswith("--")):
+            error(f"unrecognized arguments: {arg}")
+        if not sep:
+            if i >= len(argv) or (argv[i].startswith("-") and not argv[i][1:].isdigit()):
+                error(f"argument {name}: expected one argument")
+            value = argv[i]
+            i += 1
+        args[options[name]] = value
+        
+    return types.SimpleNamespace(**args)
+    
 def main():
     """主函数"""
-    parser = argparse.ArgumentParser(description="FT8PYCLI - FT8解码命令行工具")
-    parser.add_argument("-c", "--config", help="配置文件路径")
-    parser.add_argument("-f", "--file", help="解码指定的WAV文件")
-    parser.add_argument("-d", "--device", help="指定音频设备ID进行实时解码")
-    parser.add_argument("-v", "--verbose", action="store_true", help="详细日志输出")
-    parser.add_argument("--version", action="version", version="FT8PYCLI v1.0.0")
-    
-    args = parser.parse_args()
+    args = parse_args(sys.argv[1:])
     
     # 加载配置
     config_file = args.config or os.path.join(os.path.dirname(os.path.abspath(__file__)), "../config/ft8pycli.json")
@@ -793,8 +1317,8 @@ def main():
         # 保存配置
         save_config(config, config_file)
         
-        # 停止FT8PYCLI
-        ft8pycli.stop()
+        # 停止FT8PYCLI并释放资源
+        ft8pycli.close()
     
     print("FT8PYCLI已退出")
     
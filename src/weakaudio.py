@@ -6,16 +6,46 @@
 import numpy
 import time
 import threading
+import queue
 import multiprocessing
+import multiprocessing.shared_memory
+import weakref
+import struct
 import os
+import subprocess
 
 import weakutil
 
+have_numba = False
+try:
+    from numba import njit
+    have_numba = True
+except ImportError:
+    pass
+
+if have_numba:
+    @njit(cache=True)
+    def _abs_stats(buf):
+        # one pass: sum of |x| and max(x), no abs(buf) temporary.
+        total = 0.0
+        mx = buf[0]
+        for i in range(len(buf)):
+            x = buf[i]
+            total += abs(float(x))
+            if x > mx:
+                mx = x
+        return total, float(mx)
+else:
+    def _abs_stats(buf):
+        return float(numpy.sum(numpy.abs(buf))), float(numpy.max(buf))
+
 # desc is [ "6", "0" ] for a sound card -- sixth card, channel 0 (left).
-def new(desc, rate):
+# quality is a weakutil.resampler_presets key, or None to choose
+# from the card and app rates.
+def new(desc, rate, quality=None):
     # sound card?
     if desc[0].isdigit():
-        return Stream(int(desc[0]), int(desc[1]), rate)
+        return Stream(int(desc[0]), int(desc[1]), rate, quality)
 
     sys.stderr.write("weakaudio: cannot understand card %s\n" % (desc[0]))
     usage()
@@ -40,77 +70,74 @@ def pya():
         #os.close(nullfd)
     return global_pya
 
-# find the lowest supported input rate >= rate.
-# needed on Linux but not the Mac (which converts as needed).
-def x_pya_input_rate(card, rate):
-    import pyaudio
-    rates = [ rate, 8000, 11025, 12000, 16000, 22050, 44100, 48000 ]
-    for r in rates:
-        if r >= rate:
-            ok = False
-            try:
-                ok = pya().is_format_supported(r,
-                                               input_device=card,
-                                               input_format=pyaudio.paInt16,
-                                               input_channels=1)
-            except:
-                pass
-            if ok:
-                return r
-    sys.stderr.write("weakaudio: no input rate >= %d\n" % (rate))
-    sys.exit(1)
+# find the lowest supported rate >= rate, for input ("in") or
+# output ("out"). needed on Linux but not the Mac (which converts
+# as needed). run by pya_probe_rate() in a fresh interpreter.
+probe_script = """
+import sys
+import pyaudio
+card = int(sys.argv[1])
+rate = int(sys.argv[2])
+direction = sys.argv[3]
+pa = pyaudio.PyAudio()
+rates = [ rate, 8000, 11025, 12000, 16000, 22050, 44100, 48000 ]
+for r in rates:
+    if r >= rate:
+        ok = False
+        try:
+            if direction == "in":
+                ok = pa.is_format_supported(r,
+                                            input_device=card,
+                                            input_format=pyaudio.paInt16,
+                                            input_channels=1)
+            else:
+                ok = pa.is_format_supported(r,
+                                            output_device=card,
+                                            output_format=pyaudio.paInt16,
+                                            output_channels=1)
+        except:
+            pass
+        if ok:
+            sys.stdout.write("%d\\n" % (r))
+            sys.exit(0)
+sys.stderr.write("weakaudio: no %sput rate >= %d\\n" % (direction, rate))
+sys.exit(1)
+"""
+
+# answers from pya_input_rate() and pya_output_rate(), keyed by
+# (card, rate, "in" or "out"), so that opening the same card again
+# doesn't pay for another probe sub-process. not saved across runs,
+# since card numbers can change when devices are plugged in.
+rate_cache = { }
 
-# sub-process to avoid initializing pyaudio in main
-# process, since that makes subsequent forks and
-# multiprocessing not work.
 def pya_input_rate(card, rate):
-    rpipe, wpipe = multiprocessing.Pipe(False)
-    pid = os.fork()
-    if pid == 0:
-        rpipe.close()
-        x = x_pya_input_rate(card, rate)
-        wpipe.send(x)
-        os._exit(0)
-    wpipe.close()
-    x = rpipe.recv()
-    os.waitpid(pid, 0)
-    rpipe.close()
-    return x
-
-def x_pya_output_rate(card, rate):
-    import pyaudio
-    rates = [ rate, 8000, 11025, 12000, 16000, 22050, 44100, 48000 ]
-    for r in rates:
-        if r >= rate:
-            ok = False
-            try:
-                ok = pya().is_format_supported(r,
-                                               output_device=card,
-                                               output_format=pyaudio.paInt16,
-                                               output_channels=1)
-            except:
-                pass
-            if ok:
-                return r
-    sys.stderr.write("weakaudio: no output rate >= %d\n" % (rate))
-    sys.exit(1)
+    key = (card, rate, "in")
+    if key not in rate_cache:
+        rate_cache[key] = pya_probe_rate(card, rate, "in")
+    return rate_cache[key]
 
 def pya_output_rate(card, rate):
-    rpipe, wpipe = multiprocessing.Pipe(False)
-    pid = os.fork()
-    if pid == 0:
-        rpipe.close()
-        x = x_pya_output_rate(card, rate)
-        wpipe.send(x)
-        os._exit(0)
-    wpipe.close()
-    x = rpipe.recv()
-    os.waitpid(pid, 0)
-    rpipe.close()
-    return x
+    key = (card, rate, "out")
+    if key not in rate_cache:
+        rate_cache[key] = pya_probe_rate(card, rate, "out")
+    return rate_cache[key]
+
+# sub-process to avoid initializing pyaudio in main
+# process, since that makes subsequent forks and
+# multiprocessing not work.
+# a fresh interpreter that imports only pyaudio, rather than
+# os.fork(), which isn't safe once the caller has started threads
+# and duplicates this process's whole address space.
+def pya_probe_rate(card, rate, direction):
+    p = subprocess.run([ sys.executable, "-c", probe_script,
+                         str(card), str(rate), direction ],
+                       stdout=subprocess.PIPE)
+    if p.returncode != 0:
+        sys.exit(1)
+    return int(p.stdout)
 
 class Stream:
-    def __init__(self, card, chan, rate):
+    def __init__(self, card, chan, rate, quality=None):
         self.use_oss = False
         #self.use_oss = ("freebsd" in sys.platform)
         self.card = card
@@ -131,12 +158,26 @@ def __init__(self, card, chan, rate):
         self.last_adc_end = None
         self.last_end_time = None
 
+        # set in the pya sub-process; junklog() writes directly if None.
+        self.log_q = None
+
         if self.use_oss:
             self.oss_open()
         else:
             self.pya_open()
 
-        self.resampler = weakutil.Resampler(self.cardrate, self.rate)
+        # no resampler at all if the card runs at the app's rate.
+        # otherwise a short filter is plenty when the card rate is
+        # close to the app's rate; large ratios (e.g. 48000 -> 6000)
+        # get the longer one.
+        self.resampler = None
+        if self.cardrate != self.rate:
+            if quality == None:
+                if self.cardrate <= 2 * self.rate:
+                    quality = "low"
+                else:
+                    quality = "medium"
+            self.resampler = weakutil.PolyResampler(self.cardrate, self.rate, quality)
 
         # rate at which len(self.raw_read()) increases.
         self.rawrate = self.cardrate
@@ -152,35 +193,90 @@ def read(self):
         return [ buf2, tm ]
 
     def raw_read(self):
-        bufs = [ ]
         end_time = self.last_end_time
-        while self.rpipe.poll():
-            e = self.rpipe.recv()
-            # e is [ pcm, unix_end_time ]
-            bufs.append(e[0])
-            end_time = e[1]
-
-        if len(bufs) > 0:
-            buf = numpy.concatenate(bufs)
+
+        # the sub-process writes the ring's head index to the pipe as
+        # an 8-byte record each time it has filled more slots. the
+        # records are smaller than PIPE_BUF, so never split, and one
+        # non-blocking read collects all of them at once.
+        msgs = b""
+        while True:
+            try:
+                x = os.read(self.rpipe.fileno(), 65536)
+            except BlockingIOError:
+                break
+            msgs += x
+            if len(x) < 65536:
+                break
+
+        tail = int(self.ring_tail[0])
+        head = tail
+        if len(msgs) > 0:
+            head = struct.unpack_from("<q", msgs, len(msgs) - 8)[0]
+
+        # copy the samples straight out of shared memory into a
+        # single array of the final size. the caller (e.g. ft8.py's
+        # gocard()) keeps the returned buffers, so it has to be a
+        # fresh array rather than a view of a reused one.
+        n = head - tail
+        if n > 0:
+            bs = self.bufsize
+            slots = numpy.arange(tail, head) % self.nslots
+            lens = self.ring_lens[slots]
+            buf = numpy.empty(int(numpy.sum(lens)), dtype=numpy.int16)
+            if numpy.all(lens == bs):
+                # usual case: whole slots, in at most two contiguous
+                # runs of the ring, so at most two copies.
+                s0 = tail % self.nslots
+                k = min(n, self.nslots - s0)
+                buf[0:k*bs] = self.ring[s0:s0+k].reshape(-1)
+                buf[k*bs:] = self.ring[0:n-k].reshape(-1)
+            else:
+                off = 0
+                for slot, m in zip(slots, lens):
+                    buf[off:off+m] = self.ring[slot,0:m]
+                    off += m
+            end_time = float(self.ring_times[(head - 1) % self.nslots])
+            # the copy is done, so pya_callback may reuse the slots.
+            self.ring_tail[0] = head
         else:
-            buf = numpy.array([])
+            buf = numpy.array([], dtype=numpy.int16)
 
         self.last_end_time = end_time
 
         return [ buf, end_time ]
 
     def postprocess(self, buf):
+        if self.resampler == None:
+            return buf
         if len(buf) > 0:
             buf = self.resampler.resample(buf)
         return buf
 
     def junklog(self, msg):
       msg1 = "[%d, %d] %s\n" % (self.card, self.chan, msg)
+      if self.log_q != None:
+        # called from pya_callback: leave the disk write to log_thread.
+        self.log_q.put_nowait(msg1)
+        return
+      self.junklog_write(msg1)
+
+    def junklog_write(self, msg1):
       sys.stderr.write(msg1)
       f = open("ft8-junk.txt", "a")
       f.write(msg1)
       f.close()
 
+    # executes in the pya sub-process, so that pya_callback never
+    # waits on stderr or the file system.
+    def log_thread(self):
+        while True:
+            msg1 = self.log_q.get()
+            try:
+                self.junklog_write(msg1)
+            except:
+                pass
+
     # PyAudio calls this in a separate thread.
     def pya_callback(self, in_data, frame_count, time_info, status):
         import pyaudio
@@ -188,20 +284,19 @@ def pya_callback(self, in_data, frame_count, time_info, status):
         if status != 0:
             self.junklog("pya_callback status %d\n" % (status))
 
-        pcm = numpy.fromstring(in_data, dtype=numpy.int16)
-        pcm = pcm[self.chan::self.chans]
+        pcm = self.demux(in_data)
 
         assert frame_count == len(pcm)
 
         # time of first sample in pcm[], in seconds since start.
         adc_time = time_info['input_buffer_adc_time']
         # time of last sample
-        adc_end = adc_time + (len(pcm) / float(self.cardrate))
+        adc_end = adc_time + len(pcm) * self.inv_cardrate
 
         if self.last_adc_end != None:
             if adc_end < self.last_adc_end or adc_end > self.last_adc_end + 5:
                 self.junklog("pya last_adc_end %s adc_end %s" % (self.last_adc_end, adc_end))
-            expected = (adc_end - self.last_adc_end) * float(self.cardrate)
+            expected = (adc_end - self.last_adc_end) * self.fcardrate
             expected = int(round(expected))
             shortfall = expected - len(pcm)
             if abs(shortfall) > 20:
@@ -224,24 +319,73 @@ def pya_callback(self, in_data, frame_count, time_info, status):
         # translate time of last sample to UNIX time.
         unix_end = adc_end + self.t0
 
-        self.cardlock.acquire()
-        self.cardbufs.append([ pcm, unix_end ])
-        self.cardlock.release()
+        # hand pcm to the parent through the shared-memory slot ring.
+        # single producer (this callback), single consumer (raw_read()
+        # in the parent); each side only writes its own index, so
+        # no lock is needed.
+        if self.ring_head - self.ring_tail[0] >= len(self.ring) or len(pcm) > self.ring.shape[1]:
+            self.junklog("pya ring overflow, dropping %d samples" % (len(pcm)))
+            return ( None, pyaudio.paContinue )
+        slot = self.ring_head % len(self.ring)
+        self.ring[slot,0:len(pcm)] = pcm
+        self.ring_lens[slot] = len(pcm)
+        self.ring_times[slot] = unix_end
+        self.ring_head += 1 # publish only after the slot is filled in.
+        self.data_ev.set()
 
         return ( None, pyaudio.paContinue )
 
     def pya_open(self):
         self.cardrate = pya_input_rate(self.card, self.rate)
+        self.set_rate_consts()
         
         # read from sound card in a separate process, since Python
         # scheduler seems sometimes not to run the py audio thread
         # often enough.
         sys.stdout.flush()
+
+        # perhaps this controls how often the callback is called.
+        # too big and ft8.py's read() is delayed long enough to
+        # cut into FT8 decoding time. too small and apparently the
+        # callback thread can't keep up.
+        self.bufsize = int(self.cardrate / 8) # was 4
+
+        # the sub-process's callback writes samples into slots in
+        # shared memory, and only slot indices go through the pipe,
+        # so numpy arrays are never pickled. 256 slots is 32 seconds
+        # of audio, comfortably more than the ~13 seconds ft8.py's
+        # gocard() sleeps between reads.
+        self.nslots = 256
+        self.shm = multiprocessing.shared_memory.SharedMemory(create=True,
+                                                              size=8 + self.nslots * (16 + self.bufsize * 2))
+        weakref.finalize(self, self.shm.unlink)
+        self.shm_views()
+
         rpipe, wpipe = multiprocessing.Pipe(False)
         proc = multiprocessing.Process(target=self.pya_dev2pipe, args=[rpipe,wpipe])
         proc.start()
         wpipe.close()
         self.rpipe = rpipe
+        os.set_blocking(self.rpipe.fileno(), False)
+
+    # numpy views of the shared ring, in whichever process calls this.
+    # layout: index of the next slot raw_read() has not yet consumed,
+    # then per-slot sample counts and UNIX end times, then the samples.
+    def shm_views(self):
+        n = self.nslots
+        self.ring_tail = numpy.ndarray((1,), dtype=numpy.int64, buffer=self.shm.buf)
+        self.ring_lens = numpy.ndarray((n,), dtype=numpy.int64, buffer=self.shm.buf, offset=8)
+        self.ring_times = numpy.ndarray((n,), dtype=numpy.float64, buffer=self.shm.buf, offset=8+8*n)
+        self.ring = numpy.ndarray((n, self.bufsize), dtype=numpy.int16,
+                                  buffer=self.shm.buf, offset=8+16*n)
+
+    # don't pickle the views if the sub-process is spawned rather
+    # than forked; pya_dev2pipe re-creates them from self.shm.
+    def __getstate__(self):
+        d = self.__dict__.copy()
+        for k in [ "ring", "ring_tail", "ring_lens", "ring_times" ]:
+            d.pop(k, None)
+        return d
 
     # executes in a sub-process.
     def pya_dev2pipe(self, rpipe, wpipe):
@@ -258,12 +402,32 @@ def pya_dev2pipe(self, rpipe, wpipe):
           # but needs to be 1 for RigBlaster on Linux.
           self.chans = 1
         assert self.chan < self.chans
-
-        # perhaps this controls how often the callback is called.
-        # too big and ft8.py's read() is delayed long enough to
-        # cut into FT8 decoding time. too small and apparently the
-        # callback thread can't keep up.
-        bufsize = int(self.cardrate / 8) # was 4
+        self.set_demux()
+
+        # preallocated slots written by pya_callback, so the RT
+        # callback neither allocates list entries nor takes a lock.
+        self.shm_views()
+        self.ring_head = 0 # advanced only by pya_callback
+        self.data_ev = threading.Event() # set by pya_callback after each slot
+
+        # junklog() messages from pya_callback.
+        self.log_q = queue.SimpleQueue()
+        th = threading.Thread(target=lambda : self.log_thread())
+        th.daemon = True
+        th.start()
+
+        # ask for real-time scheduling before pya.open, so that the
+        # PortAudio callback thread inherits it and isn't delayed
+        # long enough to drop samples. usually needs root or
+        # CAP_SYS_NICE (or rtprio in limits.conf); fall back to a
+        # better nice value, and otherwise carry on as before.
+        try:
+            os.sched_setscheduler(0, os.SCHED_FIFO, os.sched_param(20))
+        except (AttributeError, OSError):
+            try:
+                os.nice(-10)
+            except (AttributeError, OSError):
+                pass
 
         # pya.open in this sub-process so that pya starts the callback thread
         # here too.
@@ -273,36 +437,58 @@ def pya_dev2pipe(self, rpipe, wpipe):
                                    input_device_index=self.card,
                                    channels=self.chans,
                                    rate=self.cardrate,
-                                   frames_per_buffer=bufsize,
+                                   frames_per_buffer=self.bufsize,
                                    stream_callback=self.pya_callback,
                                    output=False,
                                    input=True)
 
-        # copy buffers from self.cardbufs, where pya_callback left them,
-        # to the pipe to the parent process. can't do this in the callback
-        # because the pipe write might block.
-        # each object on the pipe is [ pcm, unix_end ].
+        # tell the parent process about the slots that pya_callback
+        # has filled in. can't do this in the callback because the
+        # pipe write might block.
+        # each record on the pipe is the ring's new head index, an
+        # 8-byte int; a closed pipe means the parent has gone away.
+        # sleeps until pya_callback signals, rather than polling.
+        sent = 0
         while True:
-            self.cardlock.acquire()
-            bufs = self.cardbufs
-            self.cardbufs = [ ]
-            self.cardlock.release()
-            if len(bufs) > 0:
-                for e in bufs:
-                    try:
-                        wpipe.send(e)
-                    except:
-                        os._exit(1)
-            else:
-                time.sleep(0.05)
-            
+            self.data_ev.wait(1.0)
+            # clear before looking at ring_head, so a slot published
+            # after this point sets the event again.
+            self.data_ev.clear()
+            head = self.ring_head
+            if sent < head:
+                try:
+                    os.write(wpipe.fileno(), struct.pack("<q", head))
+                except:
+                    os._exit(1)
+                sent = head
+
+    # the callbacks convert between samples and seconds on every
+    # buffer; do the division and float conversion once here.
+    def set_rate_consts(self):
+        self.fcardrate = float(self.cardrate)
+        self.inv_cardrate = 1.0 / self.cardrate
+
+    # choose, once, how to pull self.chan out of interleaved int16
+    # card data. numpy.frombuffer() is a view of the card's buffer,
+    # so the mono case doesn't copy at all; the caller copies the
+    # result to wherever it keeps it.
+    def set_demux(self):
+        if self.chans == 1:
+            self.demux = lambda data: numpy.frombuffer(data, dtype=numpy.int16)
+        else:
+            chan = self.chan
+            chans = self.chans
+            self.demux = lambda data: numpy.frombuffer(data, dtype=numpy.int16)[chan::chans]
 
     def oss_open(self):
         import ossaudiodev
         self.oss = ossaudiodev.open("/dev/dsp" + str(self.card) + ".0", "r")
         self.oss.setfmt(ossaudiodev.AFMT_S16_LE)
         self.oss.channels(2)
+        self.chans = 2
+        self.set_demux()
         assert self.oss.speed(self.rate) == self.rate
+        self.set_rate_consts()
         self.th = threading.Thread(target=lambda : self.oss_thread())
         self.th.daemon = True
         self.th.start()
@@ -320,12 +506,11 @@ def oss_thread(self):
             # the read() blocks.
             buf = self.oss.read(8192)
             assert len(buf) > 0
-            both = numpy.fromstring(buf, dtype=numpy.int16)
-            got = both[self.chan::self.chans]
+            got = self.demux(buf)
 
             self.cardlock.acquire()
             self.cardbufs.append(got)
-            self.cardtime += len(got) / float(self.rate)
+            self.cardtime += len(got) * self.inv_cardrate
             self.cardlock.release()
 
     # print levels, to help me adjust volume control.
@@ -334,7 +519,8 @@ def levels(self):
             time.sleep(1)
             [ buf, junk ] = self.read()
             if len(buf) > 0:
-                print("avg=%.0f max=%.0f" % (numpy.mean(abs(buf)), numpy.max(buf)))
+                [ total, mx ] = _abs_stats(buf)
+                print("avg=%.0f max=%.0f" % (total / len(buf), mx))
 
 def usage():
     sys.stderr.write("card format:\n")
@@ -0,0 +1,11 @@
+"""
+pytest配置
+
+src/下的模块以顶层模块方式互相导入(如 from ft8_decoder import Msg)，
+测试时同样把src/加入模块搜索路径。
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
@@ -0,0 +1,55 @@
+"""
+audio_processor模块测试
+"""
+
+import numpy as np
+import pytest
+
+from audio_processor import AudioProcessor
+
+
+@pytest.mark.parametrize("rate,target_rate,expected", [
+    (48000, 12000, (1, 4)),
+    (44100, 12000, (40, 147)),
+    (12000, 12000, (1, 1)),
+    (8000, 12000, (3, 2)),
+])
+def test_rate_ratio_exact(rate, target_rate, expected):
+    """常规采样率按最大公约数精确约分"""
+    assert AudioProcessor._rate_ratio(rate, target_rate) == expected
+
+
+def test_rate_ratio_limits_large_factors():
+    """约分后因子过大时用不超过1000的有理数近似"""
+    up, down = AudioProcessor._rate_ratio(44101, 12000)
+    assert max(up, down) <= 1000
+    assert abs(up / down - 12000 / 44101) < 1e-5
+
+
+def test_to_int16_rounds_and_clips(tmp_path):
+    """四舍五入到最近的整数(.5取偶)，超出范围的值限幅而不是回绕"""
+    processor = AudioProcessor({"temp_dir": str(tmp_path)})
+    data = np.array([0.4, 0.5, 1.5, -1.6, 2.6, 32767.4, 40000.0, -32768.6, -40000.0],
+                    dtype=np.float32)
+
+    out = processor._to_int16(data)
+
+    assert out.dtype == np.int16
+    assert out.tolist() == [0, 0, 2, -2, 3, 32767, 32767, -32768, -32768]
+
+
+def test_resample_audio_data_uses_samples_f32(tmp_path):
+    """提供samples_f32时直接作为重采样输入，结果与从int16转换相同"""
+    rng = np.random.default_rng(2)
+    samples = rng.integers(-20000, 20000, 16000).astype(np.int16)
+    base = {"sample_rate": 16000, "channels": 1, "sample_width": 2, "samples": samples}
+
+    plain = AudioProcessor({"temp_dir": str(tmp_path / "plain")})
+    plain.resample_audio_data(dict(base, content_id="a"))
+    fused = AudioProcessor({"temp_dir": str(tmp_path / "fused")})
+    fused.resample_audio_data(dict(base, content_id="a", samples_f32=samples.astype(np.float32)))
+
+    expected, rate = plain.get_cached_array("a_16000_12000")
+    out, _ = fused.get_cached_array("a_16000_12000")
+    assert rate == 12000
+    np.testing.assert_array_equal(out, expected)
@@ -0,0 +1,41 @@
+"""
+audio_recorder模块测试
+"""
+
+import numpy as np
+import pytest
+
+pytest.importorskip("pyaudio")
+
+from audio_recorder import _RingBuffer
+
+
+def test_ring_buffer_wraps():
+    """写入跨过缓冲区末尾时，按累计位置读出的数据连续"""
+    ring = _RingBuffer(10)
+    ring.push(np.arange(0, 7, dtype=np.int16))
+    ring.push(np.arange(7, 15, dtype=np.int16))
+
+    assert ring.written == 15
+    assert ring.read(5, 10).tolist() == list(range(5, 15))
+    assert ring.read(12, 3).tolist() == [12, 13, 14]
+
+
+def test_ring_buffer_overflow_keeps_newest():
+    """单次写入超过容量时只保留最新的数据，累计位置仍按全部写入数推进"""
+    ring = _RingBuffer(8)
+    ring.push(np.arange(0, 3, dtype=np.int16))
+    ring.push(np.arange(3, 23, dtype=np.int16))
+
+    assert ring.written == 23
+    assert ring.read(15, 8).tolist() == list(range(15, 23))
+
+
+def test_ring_buffer_read_returns_copy():
+    """读出的数组是副本，之后的写入不会改变它"""
+    ring = _RingBuffer(4)
+    ring.push(np.array([1, 2, 3, 4], dtype=np.int16))
+    data = ring.read(0, 4)
+    ring.push(np.array([5, 6], dtype=np.int16))
+
+    assert data.tolist() == [1, 2, 3, 4]
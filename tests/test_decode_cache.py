@@ -0,0 +1,68 @@
+"""
+decode_cache模块测试
+"""
+
+from decode_cache import DecodeCache
+from ft8_decoder import Msg
+
+
+def _msg(text: str, time: str = "99:99:99") -> Msg:
+    return Msg(time, "P0", "0.1", "1500", "-10", text, f"P0 0.1 1500 -10 {text}")
+
+
+def test_round_trip_after_reopen(tmp_path):
+    """提交后重新打开数据库仍能命中，time字段改为取出时的时间"""
+    db_path = str(tmp_path / "cache.sqlite")
+    messages = [_msg("CQ BH1ABC OM89"), _msg("BH1ABC BG2XYZ -12")]
+
+    cache = DecodeCache(db_path, signature="v1")
+    cache.put("key", messages)
+    cache.commit()
+    cache.close()
+
+    cache = DecodeCache(db_path, signature="v1")
+    hit = cache.get("key")
+    cache.close()
+
+    assert hit is not None
+    assert [m._replace(time="") for m in hit] == [m._replace(time="") for m in messages]
+    assert all(m.time != "99:99:99" for m in hit)
+
+
+def test_uncommitted_put_is_not_persisted(tmp_path):
+    """未提交的写入不会出现在新打开的数据库中"""
+    db_path = str(tmp_path / "cache.sqlite")
+
+    writer = DecodeCache(db_path)
+    writer.put("key", [_msg("CQ BH1ABC OM89")])
+    reader = DecodeCache(db_path)
+    assert reader.get("key") is None
+    reader.close()
+    writer.close()
+
+
+def test_lru_eviction():
+    """内存缓存超出容量时淘汰最近最少使用的条目"""
+    cache = DecodeCache(maxsize=2)
+    cache.put("a", [_msg("A")])
+    cache.put("b", [_msg("B")])
+    assert cache.get("a") is not None  # a变为最近使用
+    cache.put("c", [_msg("C")])
+
+    assert cache.get("b") is None
+    assert cache.get("a")[0].message == "A"
+    assert cache.get("c")[0].message == "C"
+
+
+def test_file_key_depends_on_content_and_signature(tmp_path):
+    """缓存键随文件内容和解码环境标识变化"""
+    path = tmp_path / "a.wav"
+    path.write_bytes(b"RIFF" + bytes(100))
+
+    key = DecodeCache(signature="v1").file_key(str(path))
+    assert key == DecodeCache(signature="v1").file_key(str(path))
+    assert key != DecodeCache(signature="v2").file_key(str(path))
+
+    path.write_bytes(b"RIFF" + bytes(99) + b"\x01")
+    assert key != DecodeCache(signature="v1").file_key(str(path))
+    assert DecodeCache().file_key(str(tmp_path / "missing.wav")) is None
@@ -0,0 +1,112 @@
+"""
+ft8pycli模块测试
+"""
+
+import os
+
+import pytest
+
+import ft8pycli
+from ft8pycli import _writev_all, parse_args
+
+
+def _read_all(path) -> bytes:
+    with open(path, "rb") as f:
+        return f.read()
+
+
+def test_writev_all_short_writes(tmp_path, monkeypatch):
+    """writev每次只写出一部分时，从中断处继续写完所有内容"""
+    real_writev = os.writev
+    calls = []
+
+    def short_writev(fd, buffers):
+        # 每次最多写7字节，经常在某个字节串中间截断
+        calls.append(len(buffers))
+        data = b"".join(buffers)[:7]
+        return real_writev(fd, [data])
+
+    monkeypatch.setattr(os, "writev", short_writev)
+    chunks = [b"alpha\n", b"", b"beta\n", b"gamma delta\n", b"e\n"]
+    path = tmp_path / "out.txt"
+    fd = os.open(str(path), os.O_WRONLY | os.O_CREAT)
+    try:
+        _writev_all(fd, list(chunks))
+    finally:
+        os.close(fd)
+
+    assert _read_all(path) == b"".join(chunks)
+    assert len(calls) > 1
+
+
+def test_writev_all_more_than_iov_max(tmp_path):
+    """缓冲区个数超过IOV_MAX时分多次writev写完"""
+    chunks = [f"{i}\n".encode() for i in range(3000)]
+    path = tmp_path / "out.txt"
+    fd = os.open(str(path), os.O_WRONLY | os.O_CREAT)
+    try:
+        _writev_all(fd, chunks)
+    finally:
+        os.close(fd)
+
+    assert _read_all(path) == b"".join(chunks)
+
+
+def test_writev_all_without_writev(tmp_path, monkeypatch):
+    """没有os.writev的平台合并后用os.write写出"""
+    monkeypatch.delattr(os, "writev")
+    chunks = [b"one\n", b"two\n"]
+    path = tmp_path / "out.txt"
+    fd = os.open(str(path), os.O_WRONLY | os.O_CREAT)
+    try:
+        _writev_all(fd, chunks)
+    finally:
+        os.close(fd)
+
+    assert _read_all(path) == b"one\ntwo\n"
+
+
+def test_parse_args_defaults():
+    """没有参数时全部取默认值"""
+    args = parse_args([])
+    assert (args.config, args.file, args.device, args.verbose) == (None, None, None, False)
+
+
+@pytest.mark.parametrize("argv", [
+    ["-c", "a.json", "-f", "x.wav", "-d", "3", "-v"],
+    ["--config", "a.json", "--file", "x.wav", "--device", "3", "--verbose"],
+    ["--config=a.json", "--file=x.wav", "--device=3", "-v"],
+])
+def test_parse_args_option_forms(argv):
+    """短选项、长选项和--option=值三种写法结果相同"""
+    args = parse_args(argv)
+    assert (args.config, args.file, args.device, args.verbose) == ("a.json", "x.wav", "3", True)
+
+
+def test_parse_args_negative_number_value():
+    """以-开头的数字作为选项值而不是选项"""
+    assert parse_args(["-d", "-1"]).device == "-1"
+
+
+@pytest.mark.parametrize("argv", [
+    ["--bogus"],
+    ["-c"],
+    ["-c", "-v"],
+    ["-c=a.json"],
+    ["extra"],
+])
+def test_parse_args_errors_exit_2(argv, capsys):
+    """无法识别的参数或缺少选项值时输出用法并以状态码2退出"""
+    with pytest.raises(SystemExit) as exc:
+        parse_args(argv)
+    assert exc.value.code == 2
+    assert capsys.readouterr().err.startswith(ft8pycli._USAGE)
+
+
+@pytest.mark.parametrize("argv,expected", [(["-h"], ft8pycli._HELP), (["--version"], ft8pycli._VERSION + "\n")])
+def test_parse_args_help_and_version(argv, expected, capsys):
+    """-h和--version输出后以状态码0退出"""
+    with pytest.raises(SystemExit) as exc:
+        parse_args(argv)
+    assert exc.value.code == 0
+    assert capsys.readouterr().out == expected
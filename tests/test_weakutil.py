@@ -0,0 +1,42 @@
+"""
+weakutil模块测试
+"""
+
+import numpy as np
+import pytest
+import scipy.signal
+
+import weakutil
+
+
+@pytest.mark.parametrize("from_rate,to_rate", [(48000, 12000), (44100, 12000), (8000, 12000)])
+@pytest.mark.parametrize("quality", ["low", "medium", "high"])
+def test_poly_resampler_stream_matches_one_shot(from_rate, to_rate, quality):
+    """分块流式重采样的结果与整段upfirdn一次计算相同"""
+    rng = np.random.default_rng(1)
+    x = rng.integers(-20000, 20000, from_rate * 2).astype(np.int16)
+
+    r = weakutil.PolyResampler(from_rate, to_rate, quality)
+    out = []
+    i = 0
+    while i < len(x):
+        n = int(rng.integers(1, from_rate // 4))
+        out.append(r.resample(x[i:i + n]))
+        i += n
+    out = np.concatenate(out)
+
+    y = scipy.signal.upfirdn(r.h, x.astype(np.float32), r.up, r.down)
+    expected = y[r.delay_out:r.delay_out + len(out)]
+
+    assert out.dtype == np.float32
+    assert len(out) == len(expected)
+    # 流式输出只差滤波器尾部尚未完整的几个采样
+    assert len(x) * to_rate // from_rate - len(out) <= len(r.h) // r.down + 1
+    np.testing.assert_array_equal(out, expected)
+
+
+def test_poly_resampler_same_rate_is_passthrough():
+    """采样率相同时原样返回"""
+    x = np.arange(100, dtype=np.int16)
+    r = weakutil.PolyResampler(12000, 12000)
+    assert r.resample(x) is x